@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Batch mutations: importing N todos and then clearing them as the page
+did it (one POST per todo, each followed by the loadTodos() refresh)
+against one POST /api/todos/batch and one refresh. Time, round trips,
+bytes on the wire and journal fsyncs, on the threaded server with the
+journal on disk.
+
+    python benchmarks/bench_batch.py [todos]
+"""
+
+import http.client
+import json
+import sys
+import time
+
+from common import make_app, start_server
+
+
+class Client:
+    """Keep-alive connection that counts requests and bytes, like the page's fetch()."""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        self.requests = self.sent = self.received = 0
+        self.rev = None
+
+    def call(self, method, url, data=None):
+        body = json.dumps(data).encode() if data is not None else None
+        self.conn.request(method, url, body=body, headers={"Content-Type": "application/json"})
+        response = self.conn.getresponse()
+        raw = response.read()
+        assert response.status == 200, (url, response.status, raw[:200])
+        self.requests += 1
+        self.sent += len(url) + len(body or b"")
+        self.received += len(raw)
+        return json.loads(raw)
+
+    def sync(self):
+        # sync('todos'): the full list the first time, then ?since=rev
+        url = "/api/todos" if self.rev is None else f"/api/todos?since={self.rev}"
+        self.rev = self.call("GET", url)["rev"]
+
+
+def run(count, batched):
+    app = make_app()
+    app.start()
+    httpd = app.server(("127.0.0.1", 0), workers=4)
+    start_server(httpd)
+    client = Client(httpd.server_port)
+    client.sync()
+    fsyncs = app.todos.journal.fsyncs
+
+    start = time.perf_counter()
+    if batched:
+        ids = client.call("POST", "/api/todos/batch",
+                          {"ops": [{"op": "add", "text": f"task {i}"} for i in range(count)]})["ids"]
+        client.sync()
+        client.call("POST", "/api/todos/batch", {"ops": [{"op": "delete", "id": i} for i in ids]})
+        client.sync()
+    else:
+        ids = []
+        for i in range(count):
+            ids.append(client.call("POST", "/api/todos", {"text": f"task {i}"})["id"])
+            client.sync()
+        for todo_id in ids:
+            client.call("POST", "/api/todos/delete", {"id": todo_id})
+            client.sync()
+    elapsed = time.perf_counter() - start
+
+    fsyncs = app.todos.journal.fsyncs - fsyncs
+    assert len(set(ids)) == count and len(app.todos) == 0
+    httpd.shutdown()
+    httpd.close_gracefully()
+    app.stop()
+    return elapsed, client.requests - 1, client.sent + client.received, fsyncs
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"add {count} todos, then delete them (journal fsync'd):")
+    print(f"  {'':14} {'time':>9} {'requests':>9} {'KiB':>8} {'fsyncs':>7}")
+    results = {}
+    for label, batched in (("single calls", False), ("batch", True)):
+        elapsed, requests, size, fsyncs = results[label] = run(count, batched)
+        print(f"  {label:14} {elapsed * 1e3:7.0f}ms {requests:9d} {size / 1024:8.0f} {fsyncs:7d}")
+    single, batch = results["single calls"][0], results["batch"][0]
+    print(f"  batch is {single / batch:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Request body memory profile: peak Python allocation while handling
+one upload, with tracemalloc. Compares the old read-everything path
+(rfile.read + json.loads + b64decode) with the chunked readers, and
+fails if a streamed path peaks anywhere near the body size.
+
+    python benchmarks/bench_bodies.py [image MiB]
+"""
+
+import base64
+import io
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from common import ROOT  # noqa: F401  (puts the repo on sys.path)
+from ipadsuite.blobs import BlobStore
+from ipadsuite.bodies import CHUNK, BodyReader, read_json
+
+MAX_STREAMED_CHUNKS = 16  # Peak allowed to the streamed paths, whatever the body size
+
+
+def peak(fn):
+    """Peak bytes allocated while ``fn`` runs (inputs already in memory are not counted)."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def chunked(data, size=16 * 1024):
+    out = io.BytesIO()
+    for i in range(0, len(data), size):
+        piece = data[i:i + size]
+        out.write(b"%x\r\n" % len(piece) + piece + b"\r\n")
+    out.write(b"0\r\n\r\n")
+    return out.getvalue()
+
+
+def main():
+    mib = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    image = os.urandom(mib * 1024 * 1024)
+    note = json.dumps({"text": "foto", "image": "data:image/jpeg;base64," + base64.b64encode(image).decode()}).encode()
+    limit = len(note) + 1
+
+    with tempfile.TemporaryDirectory() as d:
+        store = BlobStore(d)
+
+        def old_note():
+            rfile = io.BytesIO(note)
+            data = json.loads(rfile.read(len(note)))
+            store.put_bytes(base64.b64decode(data["image"].partition(",")[2]))
+
+        def new_note():
+            reader = BodyReader(io.BytesIO(note), {"Content-Length": str(len(note))}, limit)
+            data = read_json(reader, store)
+            assert store.exists(data["image"])
+
+        def raw_upload():
+            reader = BodyReader(io.BytesIO(image), {"Content-Length": str(len(image))}, limit)
+            store.put_stream(reader)
+
+        body = chunked(image)
+
+        def chunked_upload():
+            reader = BodyReader(io.BytesIO(body), {"Transfer-Encoding": "chunked"}, limit)
+            store.put_stream(reader)
+
+        print(f"{mib} MiB image ({len(note) / 2**20:.1f} MiB as a data URL), chunk size {CHUNK // 1024} KiB")
+        print("peak allocation per upload:")
+        streamed = {}
+        for name, fn, bounded in [("inline note, read everything", old_note, False),
+                                  ("inline note, streamed", new_note, True),
+                                  ("raw /api/blobs", raw_upload, True),
+                                  ("raw /api/blobs, chunked", chunked_upload, True)]:
+            used = peak(fn)
+            print(f"  {name:30} {used / 1024:10.0f} KiB  ({used / CHUNK:6.1f} chunks)")
+            if bounded:
+                streamed[name] = used
+
+    bound = min(MAX_STREAMED_CHUNKS * CHUNK, len(image) // 4)
+    for name, used in streamed.items():
+        assert used < bound, f"{name}: peak {used / 1024:.0f} KiB, expected under {bound / 1024:.0f} KiB"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Store contention: throughput of concurrent toggles, edits, comments
+and full-state reads (what GET /api/notes does on a cache miss) as
+workers grow, striped item locks vs one lock around everything (the
+store before this change: the operation, the record encoding and the
+readers' copies all under the same lock). Both use the same
+copy-on-write items, so only the locking differs; each figure is the
+median of REPEATS runs.
+
+    python benchmarks/bench_contention.py [items] [seconds per run]
+"""
+
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from common import percentile
+from ipadsuite.store import Collection
+
+WORKERS = (1, 2, 4, 8, 16)
+REPEATS = 3
+
+
+class GlobalLock(Collection):
+    """Every writer and reader goes through one lock."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._global = threading.RLock()
+
+    def _stripe(self, item_id):
+        return self._global  # The fsync wait stays outside, as it was
+
+    def state(self):
+        with self._global:
+            return super().state()
+
+    def item(self, item_id):
+        with self._global:
+            return super().item(item_id)
+
+
+def fill(collection, count):
+    return [collection.add({"text": f"nota {i}", "done": False, "comments": []})[0] for i in range(count)]
+
+
+def run(collection, ids, workers, seconds, reads):
+    stop = threading.Event()
+    done = [0] * workers
+    latencies = []
+
+    def work(w):
+        rng = random.Random(w)
+        n = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            item_id = rng.choice(ids)
+            roll = rng.random()
+            if roll < reads:
+                collection.state()
+            elif roll < 0.5:
+                collection.commit("toggle", id=item_id)
+            elif roll < 0.75:
+                collection.commit("edit", id=item_id, text=f"testo {n}")
+            else:
+                collection.commit("comment", id=item_id, comment={"text": "ok", "time": ""})
+            collection.item(item_id)  # The response
+            n += 1
+            if not n % 8:
+                latencies.append(time.perf_counter() - started)
+        done[w] = n
+
+    threads = [threading.Thread(target=work, args=(w,)) for w in range(workers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return sum(done) / seconds, percentile(latencies, 99)
+
+
+def compare(title, items, seconds, reads, durable):
+    print(title)
+    print(f"  {'workers':>7} {'global lock':>12} {'striped':>12}   ops/s"
+          f"   {'global lock':>11} {'striped':>9}   p99 ms")
+    for workers in WORKERS:
+        runs = {GlobalLock: [], Collection: []}
+        for _ in range(REPEATS):
+            for cls in runs:  # Alternated, so a slow spell of the machine hits both
+                with tempfile.TemporaryDirectory() as data:
+                    collection = cls("notes", sync=durable, snapshot_every=10 ** 9)
+                    ids = fill(collection, items)
+                    if durable:
+                        collection.open(data)  # Journal from here on; fill() stayed in memory
+                        collection.items.update({i: {"text": "", "done": False, "comments": []} for i in ids})
+                    runs[cls].append(run(collection, ids, workers, seconds, reads))
+                    collection.close()
+        (old, old_p99), (new, new_p99) = [
+            (statistics.median(r for r, _ in results), statistics.median(p for _, p in results))
+            for results in runs.values()]
+        print(f"  {workers:7d} {old:12.0f} {new:12.0f}   {new / old:5.2f}x"
+              f"   {old_p99 * 1e3:11.2f} {new_p99 * 1e3:9.2f}")
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+    compare(f"in memory, {items} notes, 1% full-state reads:", items, seconds, 0.01, False)
+    compare(f"journaled (fsync per commit, group commit), {items} notes, 1% full-state reads:",
+            items, seconds, 0.01, True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Event push with many idle subscribers: threads, memory and CPU while
+idle, and fan-out latency of one event to everybody.
+
+    python benchmarks/bench_events.py [subscribers] [idle seconds]
+"""
+
+import resource
+import selectors
+import socket
+import sys
+import threading
+import time
+
+from common import make_app, start_server
+
+
+def rss_mib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    idle = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * count + 256)), hard))
+
+    app = make_app(["notes", "smb"])
+    app.hub.start()
+    httpd = app.server(("127.0.0.1", 0), workers=16)
+    start_server(httpd)
+    port = httpd.server_port
+
+    base_rss, base_threads = rss_mib(), threading.active_count()
+    clients = []
+    for _ in range(count):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(b"GET /api/events HTTP/1.1\r\nHost: x\r\n\r\n")
+        clients.append(sock)
+    while app.hub.subscribers < count:
+        time.sleep(0.05)
+    for sock in clients:
+        sock.recv(65536)  # Headers and the retry: line
+
+    rss, threads = rss_mib(), threading.active_count()
+    cpu = time.process_time()
+    time.sleep(idle)
+    idle_cpu = time.process_time() - cpu
+
+    sel = selectors.DefaultSelector()
+    for sock in clients:
+        sock.setblocking(False)
+        sel.register(sock, selectors.EVENT_READ)
+    start = time.perf_counter()
+    app.todos.commit("add", id="x", item={"text": "ping", "done": False})
+    waiting = set(clients)
+    while waiting:
+        for key, _ in sel.select(5):
+            data = key.fileobj.recv(65536)
+            if b"todos" in data:
+                waiting.discard(key.fileobj)
+                sel.unregister(key.fileobj)
+    fanout = time.perf_counter() - start
+
+    for sock in clients:
+        sock.close()
+    httpd.shutdown()
+    httpd.close_gracefully()
+    app.hub.close()
+
+    print(f"subscribers:         {count}")
+    print(f"threads:             {base_threads} before, {threads} with subscribers")
+    print(f"RSS:                 {rss - base_rss:8.1f} MiB for all subscribers (client sockets included)")
+    print(f"CPU while idle:      {idle_cpu * 1e3:8.1f} ms over {idle:.0f} s")
+    print(f"fan-out of 1 event:  {fanout * 1e3:8.1f} ms to all subscribers")
+
+
+if __name__ == "__main__":
+    main()
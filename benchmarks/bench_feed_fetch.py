@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Feed refresh wall-clock time: serial vs parallel fetching, and the
+second round served as 304s by conditional GET.
+
+    python benchmarks/bench_feed_fetch.py [feeds]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ipadsuite.feeds import FeedCache  # noqa: E402
+from stub_feeds import StubFeedServer  # noqa: E402
+
+
+def timed_refresh(cache):
+    start = time.perf_counter()
+    cache.refresh_due()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latencies = [0.05 + 0.05 * i for i in range(count)]
+    with StubFeedServer() as stub:
+        urls = [stub.url(f"f{i}", items=50, delay=d) for i, d in enumerate(latencies)]
+
+        serial = timed_refresh(FeedCache(urls, workers=1))
+
+        cache = FeedCache(urls, ttl=0)
+        parallel = timed_refresh(cache)
+        stub.not_modified = 0
+        conditional = timed_refresh(cache)
+        not_modified = stub.not_modified
+
+        # One unreachable feed must not hold back or break the others
+        slow = FeedCache(urls + [stub.url("hang", delay=30)], timeout=1)
+        with_timeout = timed_refresh(slow)
+        failed = [s["url"] for s in slow.snapshot()["sources"] if s["error"]]
+
+    print(f"feeds:               {count}")
+    print(f"sum(latency):        {sum(latencies) * 1e3:8.1f} ms")
+    print(f"max(latency):        {max(latencies) * 1e3:8.1f} ms")
+    print(f"serial refresh:      {serial * 1e3:8.1f} ms")
+    print(f"parallel refresh:    {parallel * 1e3:8.1f} ms")
+    print(f"conditional refresh: {conditional * 1e3:8.1f} ms ({not_modified}/{count} not modified)")
+    print(f"with a hung feed:    {with_timeout * 1e3:8.1f} ms ({len(failed)} failed)")
+
+
+if __name__ == "__main__":
+    main()
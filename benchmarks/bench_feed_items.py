@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Feed item store: ingest throughput for large feeds (new entries, then
+the same feed again, all duplicates), and GET /api/rss?limit=30 page
+latency with 100k stored items, against sorting everything by date.
+
+    python benchmarks/bench_feed_items.py [entries per feed] [stored items]
+"""
+
+import sys
+import tempfile
+import time
+
+import feedparser
+
+from common import percentile
+from ipadsuite.feeditems import FeedItems
+from stub_feeds import render_feed
+
+
+def ingest(entries):
+    feed = feedparser.parse(render_feed("big", entries))
+    with tempfile.TemporaryDirectory() as data:
+        items = FeedItems(max_items=10 ** 7)
+        items.open(data)
+        start = time.perf_counter()
+        new = items.ingest("http://stub.local/big", "big", feed.entries)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        again = items.ingest("http://stub.local/big", "big", feed.entries)
+        second = time.perf_counter() - start
+        items.close()
+    assert new == entries and again == 0
+    print(f"ingest a feed of {entries} entries (journaled, one fsync):")
+    print(f"  new:        {first * 1e3:7.1f} ms  {entries / first:9.0f} entries/s")
+    print(f"  duplicates: {second * 1e3:7.1f} ms  {entries / second:9.0f} entries/s")
+
+
+def paging(count):
+    items = FeedItems(max_items=10 ** 7)  # In memory: the pages are what is measured
+    now = time.time()
+    for feed in range(count // 1000):
+        entries = [{"id": f"feed{feed}-{i}", "title": f"item {i}", "link": f"http://stub.local/{feed}/{i}",
+                    "published_parsed": time.gmtime(now - (i * 1733 + feed * 13) % (20 * 86400))}
+                   for i in range(1000)]
+        items.ingest(f"http://stub.local/{feed}", f"feed {feed}", entries, now)
+    items.mark(list(items.collection.items)[::2])
+    collection = items.collection
+
+    def pages(value):
+        cursor, times = None, []
+        while True:
+            start = time.perf_counter()
+            _, page, cursor = collection.page(value, cursor, 30, newest_first=True)
+            times.append(time.perf_counter() - start)
+            if cursor is None or len(times) >= 400:
+                return times
+
+    every = pages(collection.index.ANY)
+    unread = pages(False)
+    start = time.perf_counter()
+    for _ in range(3):
+        sorted(collection.items.items(), key=lambda kv: kv[1]["published"], reverse=True)[:30]
+    scan = (time.perf_counter() - start) / 3
+    start = time.perf_counter()
+    expired = collection.expired(time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - 10 * 86400)), count)
+    lookup = time.perf_counter() - start
+
+    print(f"{len(items)} stored items from {count // 1000} feeds, half read, 30 per page:")
+    print(f"  all feeds by date: p50 {percentile(every, 50) * 1e6:5.0f} µs  p99 {percentile(every, 99) * 1e6:5.0f} µs"
+          f"  ({len(every)} pages)")
+    print(f"  unread only:       p50 {percentile(unread, 50) * 1e6:5.0f} µs  p99 {percentile(unread, 99) * 1e6:5.0f} µs")
+    print(f"  sort everything per page: {scan * 1e3:.0f} ms")
+    print(f"  retention lookup (older than 10 days): {len(expired)} items in {lookup * 1e3:.1f} ms")
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    ingest(entries)
+    paging(count)
+
+
+if __name__ == "__main__":
+    main()
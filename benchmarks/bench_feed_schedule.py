@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Feed scheduling with many subscriptions: requests sent, feeds parsed
+and CPU used by the refresher over a fixed time, every feed on the
+same fixed interval (as before) against the adaptive scheduler, on a
+stub server (in its own process) with changing, static (with and
+without ETag) and failing feeds. Then checks the adaptive schedule:
+failing feeds back off, changing feeds keep short delays and static
+ones get stretched.
+
+    python benchmarks/bench_feed_schedule.py [feeds] [seconds] [interval]
+"""
+
+import multiprocessing
+import sys
+import time
+
+from common import ROOT  # noqa: F401  (puts the repo on sys.path)
+from ipadsuite.feeds import FeedCache
+from stub_feeds import StubFeedServer
+
+
+class FixedInterval(FeedCache):
+    """The old behaviour: every feed every ``interval``, and every 200 parsed."""
+
+    def refresh(self, url):
+        with self._lock:
+            self._state.get(url, {}).pop("digest", None)
+        return super().refresh(url)
+
+    def _reschedule(self, url, result, now):
+        with self._lock:
+            self._push(url, now + self._schedule[url]["interval"])
+
+
+def serve(conn):
+    with StubFeedServer() as stub:
+        conn.send(stub.server_port)
+        conn.recv()  # Until the run is over
+        conn.send((stub.hits, stub.times))
+
+
+def feed_urls(port, count, interval):
+    base = f"http://127.0.0.1:{port}/feed"
+    kinds = {
+        "changing": f"items=30&every={interval * 4:g}",  # A new item every 4 intervals
+        "static": "items=30",  # 304 every time
+        "static-noetag": "items=30&etag=0",  # Same body, no ETag
+        "failing": "fail=1",
+    }
+    shares = {"changing": 0.4, "static": 0.3, "static-noetag": 0.2, "failing": 0.1}
+    urls = {}
+    for kind, share in shares.items():
+        for i in range(int(count * share)):
+            urls[f"{base}/{kind}-{i}?{kinds[kind]}"] = kind
+    return urls
+
+
+def run(cls, count, seconds, interval):
+    parent, child = multiprocessing.Pipe()
+    stub = multiprocessing.Process(target=serve, args=(child,), daemon=True)
+    stub.start()
+    urls = feed_urls(parent.recv(), count, interval)
+    cache = cls(list(urls), ttl=interval, workers=16)
+    cpu = time.process_time()
+    cache.start()
+    time.sleep(seconds)
+    cache.stop(timeout=5)
+    cpu = time.process_time() - cpu
+    schedule = {kind: [] for kind in set(urls.values())}
+    for url, kind in urls.items():
+        schedule[kind].append(cache.status(url))
+    parent.send(None)
+    hits, times = parent.recv()
+    stub.join()
+
+    by_kind = {}
+    for url, kind in urls.items():
+        name = url.rsplit("/", 1)[1].split("?")[0]
+        by_kind[kind] = by_kind.get(kind, 0) + hits.get(name, 0)
+    start = min(times)
+    per_second = [0] * (int(seconds) + 2)
+    for t in times:
+        per_second[min(int(t - start), len(per_second) - 1)] += 1
+    # Busiest second once past the first fetch of everything, which is due at once
+    steady = per_second[int(2 * interval) + 1:-1]
+    return {"requests": len(times), "parses": cache.parses, "cpu": cpu, "by_kind": by_kind,
+            "peak": max(steady or [0]), "mean": sum(steady) / max(len(steady), 1), "schedule": schedule}
+
+
+def median_delay(statuses):
+    delays = sorted(s["delay"] for s in statuses)
+    return delays[len(delays) // 2]
+
+
+def check_schedule(schedule, interval):
+    """Fail unless the adaptive delays went the way each kind of feed should."""
+    failing = schedule["failing"]
+    assert all(s["failures"] >= 2 for s in failing), [s["failures"] for s in failing]
+    assert all(s["delay"] >= 4 * interval for s in failing), [s["delay"] for s in failing]
+    changing = median_delay(schedule["changing"])
+    for kind in ("static", "static-noetag"):
+        static = median_delay(schedule[kind])
+        assert static >= 2 * interval, f"{kind}: median delay {static} s"
+        assert static > changing, f"{kind}: median delay {static} s, changing feeds {changing} s"
+    assert changing <= 3 * interval, f"changing: median delay {changing} s"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    interval = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+    print(f"{count} feeds (40% changing every {interval * 4:g} s, 30% static, 20% static without ETag, "
+          f"10% failing),")
+    print(f"interval {interval:g} s, {seconds:g} s (req/s: steady-state mean/peak):")
+    print(f"  {'':10} {'requests':>9} {'parses':>7} {'CPU s':>6} {'req/s':>11}   "
+          f"{'changing':>8} {'static':>7} {'no etag':>7} {'failing':>7}")
+    results = {}
+    for label, cls in (("fixed", FixedInterval), ("adaptive", FeedCache)):
+        r = results[label] = run(cls, count, seconds, interval)
+        k = r["by_kind"]
+        print(f"  {label:10} {r['requests']:9d} {r['parses']:7d} {r['cpu']:6.1f} "
+              f"{r['mean']:5.0f}/{r['peak']:<5d}   "
+              f"{k['changing']:8d} {k['static']:7d} {k['static-noetag']:7d} {k['failing']:7d}")
+    fixed, adaptive = results["fixed"], results["adaptive"]
+    print(f"  adaptive: {fixed['requests'] / adaptive['requests']:.1f}x fewer requests, "
+          f"{fixed['parses'] / max(adaptive['parses'], 1):.1f}x fewer parses, "
+          f"{fixed['cpu'] / adaptive['cpu']:.1f}x less CPU")
+    print("  adaptive median delay (s): " + ", ".join(
+        f"{kind} {median_delay(statuses):g}" for kind, statuses in sorted(adaptive["schedule"].items())))
+    check_schedule(adaptive["schedule"], interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Item ids and paging: concurrent adds through the threaded server
+(no lost writes, also after a restart), how often the old timestamp
+ids collided, and GET /api/todos?done=false&limit=50 deep in a large
+list against sorting everything.
+
+    python benchmarks/bench_ids.py [clients] [adds per client] [todos]
+"""
+
+import http.client
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+from common import make_app, percentile, start_server
+from ipadsuite.store import Collection, base36
+
+
+def adder(port, count, ids, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    for i in range(count):
+        try:
+            conn.request("POST", "/api/todos", body=json.dumps({"text": f"task {i}"}),
+                         headers={"Content-Type": "application/json"})
+            ids.append(json.loads(conn.getresponse().read())["id"])
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            errors.append(e)
+    conn.close()
+
+
+def stress(clients, per_client):
+    app = make_app()
+    app.start()
+    httpd = app.server(("127.0.0.1", 0), workers=16)
+    start_server(httpd)
+    ids, errors = [], []
+    threads = [threading.Thread(target=adder, args=(httpd.server_port, per_client, ids, errors))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stored = len(app.todos)
+    httpd.shutdown()
+    httpd.close_gracefully()
+    app.stop()
+
+    reopened = Collection("todos")
+    reopened.open(app.data_dir)  # What the next start finds on disk
+    on_disk = len(reopened)
+    reopened.close()
+
+    total = clients * per_client
+    print(f"{clients} clients x {per_client} POST /api/todos, threaded server:")
+    print(f"  sent {total}, answered {len(ids)}, distinct ids {len(set(ids))}, "
+          f"stored {stored}, after restart {on_disk}, errors {len(errors)}")
+    print(f"  {total / elapsed:.0f} adds/s (each one fsync'd)")
+    assert len(set(ids)) == stored == on_disk == total and not errors, "lost writes"
+
+
+def old_ids(threads, per_thread):
+    # The old id: str(datetime.now().timestamp()), from concurrent requests
+    made = []
+
+    def work():
+        for _ in range(per_thread):
+            made.append(str(datetime.now().timestamp()))
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return len(made) - len(set(made))
+
+
+def paging(count):
+    todos = Collection("todos", index_by="done")
+    start = time.perf_counter()
+    for i in range(count):
+        todos.add({"text": f"task {i}", "done": False, "created": f"2026-01-01T00:00:{i // 1000:06d}"})
+    for i in range(0, count, 3):
+        todos.commit("toggle", id=base36(i + 1))  # The i-th add was record i + 1
+    build = time.perf_counter() - start
+
+    def scan(after_rank):
+        # Without an index: filter and sort everything, then slice
+        open_ = sorted((item.get("created", ""), item_id) for item_id, item in todos.items.items()
+                       if not item["done"])
+        return open_[after_rank:after_rank + 50]
+
+    cursor, pages, times = None, 0, []
+    while True:
+        start = time.perf_counter()
+        _, items, cursor = todos.page(False, cursor, 50)
+        times.append(time.perf_counter() - start)
+        pages += 1
+        if cursor is None:
+            break
+    start = time.perf_counter()
+    for _ in range(5):
+        scan(count // 2)
+    scanned = (time.perf_counter() - start) / 5
+
+    print(f"{count} todos ({count * 2 // 3} not done), index built with the adds in {build:.1f} s:")
+    print(f"  done=false&limit=50, all {pages} pages: p50 {percentile(times, 50) * 1e6:.0f} µs, "
+          f"p99 {percentile(times, 99) * 1e6:.0f} µs")
+    print(f"  filter + sort everything per page:  {scanned * 1e3:.0f} ms")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 100_000
+    stress(clients, per_client)
+    print(f"old timestamp ids, 16 threads x 20000: {old_ids(16, 20000)} duplicates")
+    paging(count)
+
+
+if __name__ == "__main__":
+    main()
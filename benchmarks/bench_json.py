@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+JSON response benchmark on a large todo list: stdlib json.dumps per
+request, the fast encoder (orjson, if installed) per request, and the
+per-revision cached body.
+
+    python benchmarks/bench_json.py [todos]
+"""
+
+import json
+import sys
+import time
+
+from common import ROOT  # noqa: F401  (puts the repo on sys.path)
+from ipadsuite import payloads
+from ipadsuite.payloads import CollectionPayload
+from ipadsuite.store import Collection
+
+
+def rate(fn, seconds=1.0):
+    """Calls per second of ``fn`` over about ``seconds``."""
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    todos = Collection("todos")  # In memoria: niente journal
+    for i in range(count):
+        todos.commit("add", id=f"{1700000000 + i}.{i:06d}",
+                     item={"text": f"Attività numero {i} da completare", "done": i % 3 == 0,
+                           "created": "2026-10-18T09:30:00"})
+    cached = CollectionPayload(todos, "todos")
+
+    def stdlib():
+        rev, items = todos.state()
+        return json.dumps({"rev": rev, "todos": items}).encode()
+
+    def fast():
+        rev, items = todos.state()
+        return payloads.dumps({"rev": rev, "todos": items})
+
+    size = len(stdlib())
+    print(f"GET /api/todos with {count} todos ({size / 1024:.0f} KiB of JSON):")
+    results = {"stdlib json (per request)": rate(stdlib)}
+    if payloads.orjson is not None:
+        results["orjson (per request)"] = rate(fast)
+    else:
+        print("  (orjson not installed: the fast encoder is the stdlib one)")
+    results["cached per revision"] = rate(cached.current)
+
+    def after_write():
+        todos.commit("toggle", id=f"{1700000000}.{0:06d}")
+        return cached.current()
+    results["cached, a write before each GET"] = rate(after_write)
+
+    base = results["stdlib json (per request)"]
+    for name, value in results.items():
+        print(f"  {name:32} {value:12.0f} req/s  {value / base:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
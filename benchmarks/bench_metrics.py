@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Instrumentation overhead: what the metrics and the access log add to
+each request. Measures the hooks on the request thread, the deferred
+folding done by the background thread, and end-to-end throughput
+against a server whose hooks record nothing.
+
+    python benchmarks/bench_metrics.py [requests]
+"""
+
+import http.client
+import io
+import sys
+import time
+import types
+
+from common import make_app, start_server
+from ipadsuite import serving
+from ipadsuite.accesslog import AccessLog
+
+
+def fake_handler(handler_class, server):
+    handler = object.__new__(handler_class)
+    handler.server = server
+    handler.client_address = ("192.168.1.20", 50000)
+    handler.command = "GET"
+    handler.path = "/api/todos?since=12"
+    handler.headers = {}
+    handler.request_version = "HTTP/1.1"
+    handler._headers_buffer = []
+    return handler
+
+
+def hook_cost(handler_class, server, n):
+    """µs per request spent on the request thread by parse/send/record hooks."""
+    handler = fake_handler(handler_class, server)
+    base = serving.http.server.BaseHTTPRequestHandler.send_header
+
+    start = time.perf_counter()
+    for _ in range(n):
+        # What parse_request(), send_response() and send_header() add
+        handler._started = time.perf_counter()
+        handler._status = 0
+        handler._sent = 0
+        handler._reader = None
+        handler.log_request(200)
+        handler._headers_buffer.clear()
+        handler.send_header("Content-Length", "512")
+        handler._record()
+    hooked = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(n):
+        handler._headers_buffer.clear()
+        base(handler, "Content-Length", "512")
+    plain = time.perf_counter() - start
+    return (hooked - plain) / n * 1e6
+
+
+def throughput(url, n):
+    conn = http.client.HTTPConnection(url[len("http://"):])
+    start = time.perf_counter()
+    for _ in range(n):
+        conn.request("GET", "/api/todos")
+        conn.getresponse().read()
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = make_app(["notes", "smb"])
+    # No background flush during the run: the fold below is timed on its own
+    httpd = serving.PooledHTTPServer(("127.0.0.1", 0), app.handler(), workers=4,
+                                     access_log=AccessLog(io.StringIO()), flush_interval=3600)
+
+    stub = types.SimpleNamespace(finished=httpd.finished)  # The hooks append to the server's own deque
+    per_request = hook_cost(httpd.RequestHandlerClass, stub, n * 10)
+    start = time.perf_counter()
+    httpd.flush_requests()
+    assert not httpd.finished, "flush_requests() left requests behind"
+    folded = (time.perf_counter() - start) / (n * 10) * 1e6
+    print(f"request thread (hooks):        {per_request:5.2f} µs per request")
+    print(f"background fold + access log:  {folded:5.2f} µs per request")
+
+    url = start_server(httpd)
+    throughput(url, 1000)  # Warm up
+    record = serving.RequestHandler._record
+    best = {"recording": 0, "not recording": 0}
+    for _ in range(3):  # Interleaved, best of three: the machine is noisy
+        serving.RequestHandler._record = record
+        best["recording"] = max(best["recording"], throughput(url, n))
+        serving.RequestHandler._record = lambda self: None
+        best["not recording"] = max(best["not recording"], throughput(url, n))
+    serving.RequestHandler._record = record
+    httpd.shutdown()
+    httpd.close_gracefully()
+    print(f"GET /api/todos, one keep-alive connection, best of 3 x {n} requests:")
+    for name, rate in best.items():
+        print(f"  {name + ':':15} {rate:8.0f} req/s ({1e6 / rate:6.1f} µs each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Routing and startup: cost of dispatching a request through the route
+table against the old if/startswith chain, and cold-start time of a
+fresh process building the app with and without the RSS module.
+
+    python benchmarks/bench_routing.py [lookups] [starts]
+"""
+
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+from common import ROOT, make_app, percentile
+
+# A mix like the page makes it: mostly polling the API, some files
+REQUESTS = [
+    ("GET", "/api/todos?since=12"), ("GET", "/api/notes?since=3"), ("GET", "/api/events/poll?since=40"),
+    ("POST", "/api/todos/toggle"), ("POST", "/api/notes/comment"),
+    ("GET", "/blobs/4c4b6a3be1314ab86138bef4314dde022e600960d8689a2c8f8631802d20dab6?w=320"),
+    ("GET", "/api/smb/file?path=film/movie.mp4"), ("GET", "/static/app.0123456789abcdef.js"), ("GET", "/nope"),
+]
+
+# What a fresh process does before it can serve
+STARTUP = """
+import sys, time
+start = time.perf_counter()
+from ipadsuite import create_app
+create_app({modules!r}, data_dir={data!r})
+print(time.perf_counter() - start, "feedparser" in sys.modules)
+"""
+
+
+def old_dispatch(method, path):
+    # The if-chain of the old ipadservernoreq.py Handler, minus the handlers
+    if method == "GET":
+        if path == "/api/todos":
+            return "todos"
+        elif path == "/api/notes":
+            return "notes"
+        elif path == "/metrics":
+            return "metrics"
+        elif path == "/api/search":
+            return "search"
+        elif path == "/api/events":
+            return "events"
+        elif path == "/api/events/poll":
+            return "poll"
+        elif path.startswith("/blobs/"):
+            return path.split("/")[-1]
+        elif path == "/api/smb":
+            return "smb"
+        elif path == "/api/smb/file":
+            return "file"
+        elif path.startswith("/static/"):
+            return "asset"
+        return None
+    if path == "/api/blobs":
+        return "upload"
+    if path == "/api/todos":
+        return "add"
+    elif path.startswith("/api/todos/"):
+        return path.split("/")[-1]
+    elif path == "/api/notes":
+        return "note"
+    elif path.startswith("/api/notes/"):
+        return path.split("/")[-1]
+    return None
+
+
+def old_request(method, raw):
+    # What do_GET/do_POST did first on every request
+    parsed = urlparse(raw)
+    parse_qs(parsed.query)
+    return old_dispatch(method, parsed.path)
+
+
+def new_request(router):
+    # What AppHandler.dispatch() does before calling the handler
+    def dispatch(method, raw):
+        path, _, qs = raw.partition("?")
+        route, params = router.match(method, path)
+        return route, parse_qs(qs) if qs else {}
+    return dispatch
+
+
+def per_lookup(fn, n, split=True):
+    requests = [(m, raw.partition("?")[0] if split else raw) for m, raw in REQUESTS]
+    start = time.perf_counter()
+    for _ in range(n // len(requests)):
+        for method, path in requests:
+            fn(method, path)
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def cold_start(modules, runs, data):
+    code = STARTUP.format(modules=modules, data=data)
+    times, loaded = [], False
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout.split()
+        times.append((time.perf_counter() - start, float(out[0])))
+        loaded = out[1] == "True"
+    return times, loaded
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 900_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+
+    app = make_app(["notes", "smb"])
+    router = app.router
+    print(f"{len(REQUESTS)} request kinds, {n} lookups")
+    print(f"  route table (match):   {per_lookup(router.match, n):6.0f} ns per request")
+    print(f"  old if-chain:          {per_lookup(old_dispatch, n):6.0f} ns per request")
+    print(f"  metrics label:         {per_lookup(lambda m, p: router.label(p), n):6.0f} ns per request")
+    print("whole dispatch (URL split, query string, lookup):")
+    print(f"  route table:           {per_lookup(new_request(router), n, split=False):6.0f} ns per request")
+    print(f"  old urlparse + chain:  {per_lookup(old_request, n, split=False):6.0f} ns per request")
+
+    print(f"cold start, median of {runs} processes (whole process / create_app() imports included):")
+    for modules in (["notes", "smb"], ["rss", "notes", "smb"]):
+        times, feedparser = cold_start(modules, runs, os.path.join(app.data_dir, "cold"))
+        process = percentile([t[0] for t in times], 50)
+        build = percentile([t[1] for t in times], 50)
+        print(f"  {','.join(modules):14} {process * 1e3:7.1f} ms / {build * 1e3:6.1f} ms"
+              f"   feedparser imported: {feedparser}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+/api/rss latency: fetching per request vs answering from FeedCache.
+
+    python benchmarks/bench_rss_cache.py [delay]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import feedparser  # noqa: E402
+
+from ipadsuite.feeds import FeedCache  # noqa: E402
+from stub_feeds import StubFeedServer  # noqa: E402
+
+
+def main():
+    delay = float(sys.argv[1]) if len(sys.argv) > 1 else 0.1
+    with StubFeedServer() as stub:
+        urls = [stub.url("hn", delay=delay), stub.url("ars", delay=delay)]
+
+        start = time.perf_counter()
+        for url in urls:
+            feedparser.parse(url)
+        per_request = time.perf_counter() - start
+
+        cache = FeedCache(urls)
+        cache.refresh_due()
+        runs = 10000
+        start = time.perf_counter()
+        for _ in range(runs):
+            cache.snapshot()
+        cached = (time.perf_counter() - start) / runs
+
+    print(f"fetch per request: {per_request * 1e3:8.1f} ms")
+    print(f"cached snapshot:   {cached * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
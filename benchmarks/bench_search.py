@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Search index benchmark: build time, index memory and query latency
+against a linear scan of every document.
+
+    python benchmarks/bench_search.py [documents]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from common import ROOT, percentile  # noqa: F401  (puts the repo on sys.path)
+from ipadsuite.search import SearchIndex, fold
+
+WORDS = (
+    "comprare latte pane caffè università città perché però già più "
+    "riunione progetto scadenza lunedì martedì mercoledì giovedì venerdì "
+    "chiamare dentista bolletta luce gas affitto libro leggere scrivere "
+    "appunti lezione esame storia matematica fisica chimica inglese "
+    "vacanza treno biglietto prenotare albergo spesa frutta verdura"
+).split()
+
+QUERIES = {
+    "common word": "spesa",
+    "rare word": "zq0042",
+    "accent folded": "perche universita",
+    "prefix": "prenot",
+    "short prefix": "le",
+    "three words": "comprare latte lunedi",
+}
+
+
+def make_docs(count, seed=1):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        words = rng.choices(WORDS, k=rng.randint(4, 20))
+        words.append(f"zq{i % 5000:04d}")  # A rare token per 20 docs
+        docs.append(" ".join(words))
+    return docs
+
+
+def build_index(docs):
+    index = SearchIndex()
+    for i, text in enumerate(docs):
+        index.add(f"note:{i}", text, {"type": "note", "id": str(i)})
+    return index
+
+
+def linear_scan(docs, query):
+    # What a search without an index does: fold and scan every text
+    terms = fold(query).split()
+    return [i for i, text in enumerate(docs) if all(t in fold(text) for t in terms)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    docs = make_docs(count)
+
+    start = time.perf_counter()
+    index = build_index(docs)
+    build = time.perf_counter() - start
+    tracemalloc.start()
+    traced = build_index(docs)  # Again, traced (tracemalloc slows the build down)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+    print(f"{count} documents indexed in {build:.2f} s, index memory {memory / 2**20:.1f} MiB")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        index.add(f"note:{i}", docs[i] + " modificato", {"type": "note", "id": str(i)})
+    print(f"re-index after edit: {(time.perf_counter() - start) / 1000 * 1e6:.0f} µs per document")
+
+    print(f"{'query':>16} {'hits':>7} {'p50 ms':>8} {'p99 ms':>8} {'scan ms':>8}")
+    for name, query in QUERIES.items():
+        times = []
+        for _ in range(30):
+            start = time.perf_counter()
+            total, _ = index.search(query, 0, 20)
+            times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        linear_scan(docs, query)
+        scan = time.perf_counter() - start
+        print(f"{name:>16} {total:7d} {percentile(times, 50) * 1e3:8.2f} "
+              f"{percentile(times, 99) * 1e3:8.2f} {scan * 1e3:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+SMB listing: the old listdir + isdir + getsize loop vs ShareBrowser
+(scandir, uncached and cached pages) on a local stand-in directory.
+
+    python benchmarks/bench_smb.py [files]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from common import ROOT  # noqa: F401
+from ipadsuite.smb import ShareBrowser
+
+
+def legacy_listing(root):
+    files = []
+    for f in os.listdir(root):
+        fpath = os.path.join(root, f)
+        files.append({
+            "name": f,
+            "is_dir": os.path.isdir(fpath),
+            "size": os.path.getsize(fpath) if not os.path.isdir(fpath) else 0,
+        })
+    return files
+
+
+def timed(fn, runs=1):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(count):
+            with open(os.path.join(root, f"file{i:06d}.bin"), "wb") as f:
+                f.write(b"x" * (i % 4096))
+        for i in range(20):
+            os.mkdir(os.path.join(root, f"dir{i:02d}"))
+
+        share = ShareBrowser(root, ttl=60)
+        legacy = timed(lambda: legacy_listing(root))
+        scan = timed(lambda: share.scan(root))
+        first = timed(lambda: share.page("", 0, 200, "size", "desc"))
+        cached = timed(lambda: share.page("", 1000, 200, "size", "desc"), runs=1000)
+        escaped = share.page("../..")
+
+    print(f"entries:                     {count + 20}")
+    print(f"listdir + isdir + getsize:   {legacy * 1e3:9.1f} ms (stat calls: ~{3 * count})")
+    print(f"scandir, one stat per entry: {scan * 1e3:9.1f} ms (stat calls: {count + 20})")
+    print(f"first page (scan + sort):    {first * 1e3:9.1f} ms")
+    print(f"cached page:                 {cached * 1e6:9.1f} us")
+    print(f"path escape rejected:        {'error' in escaped!s:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+SMB file download: peak RSS while streaming a multi-GB sparse file,
+plus a Range request and a conditional GET, all in-process. Fails if
+the download grows the peak RSS by more than a few MiB.
+
+    python benchmarks/bench_smb_download.py [GiB]
+"""
+
+import http.client
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from common import make_app, start_server
+
+MAX_GROWTH_MIB = 8  # Streaming must not hold the file (or much of it) in memory
+
+
+def peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    gib = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    size = int(gib * 1024 ** 3)
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "movie.mp4"), "wb") as f:
+            f.truncate(size)  # Sparse: no disk space used
+        open(os.path.join(root, "empty.txt"), "wb").close()
+        app = make_app(["smb"], smb={"share": root})
+        httpd = app.server(("127.0.0.1", 0), workers=4)
+        start_server(httpd)
+        conn = http.client.HTTPConnection("127.0.0.1", httpd.server_port)
+
+        before = peak_rss_mib()
+        start = time.perf_counter()
+        conn.request("GET", "/api/smb/file?path=movie.mp4")
+        resp = conn.getresponse()
+        received = 0
+        while True:
+            chunk = resp.read(1024 * 1024)
+            if not chunk:
+                break
+            received += len(chunk)
+        elapsed = time.perf_counter() - start
+        after = peak_rss_mib()
+        etag = resp.getheader("ETag")
+
+        conn.request("GET", "/api/smb/file?path=movie.mp4", headers={"Range": "bytes=1000-1999"})
+        ranged = conn.getresponse()
+        ranged_body = ranged.read()
+        conn.request("GET", "/api/smb/file?path=movie.mp4", headers={"If-None-Match": etag})
+        cached = conn.getresponse()
+        cached.read()
+        conn.request("GET", "/api/smb/file?path=empty.txt", headers={"Range": "bytes=-10"})
+        empty = conn.getresponse()
+        empty.read()
+
+        httpd.shutdown()
+        httpd.close_gracefully()
+
+    assert received == size, (received, size)
+    assert ranged.status == 206 and len(ranged_body) == 1000
+    assert cached.status == 304
+    assert empty.status == 416, empty.status  # No last 10 bytes in an empty file
+    assert after - before < MAX_GROWTH_MIB, f"peak RSS grew by {after - before:.1f} MiB"
+    print(f"downloaded:     {received / 1024 ** 3:8.2f} GiB in {elapsed:.1f} s ({received / elapsed / 1024 ** 2:.0f} MiB/s)")
+    print(f"peak RSS:       {before:8.1f} MiB before, {after:.1f} MiB after (client included)")
+    print(f"range request:  {ranged.status} {ranged.getheader('Content-Range')}")
+    print(f"conditional:    {cached.status}")
+    print(f"empty range:    {empty.status} {empty.getheader('Content-Range')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+App page delivery: bytes on the wire and server CPU per page load,
+old (HTML rebuilt and encoded per request) vs precompressed assets.
+
+    python benchmarks/bench_static.py [modules]
+"""
+
+import gzip
+import http.client
+import re
+import sys
+import time
+
+from common import make_app, start_server
+from ipadsuite.static import negotiate
+
+
+def fetch(port, path, headers):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", path, headers=headers)
+    resp = conn.getresponse()
+    body = resp.read()
+    wire = len(body) + sum(len(k) + len(v) + 4 for k, v in resp.getheaders())
+    conn.close()
+    return resp, body, wire
+
+
+def page_load(port, etags=None):
+    """Page + CSS + JS like a browser would; returns (bytes on the wire, etags)."""
+    etags = etags or {}
+    headers = {"Accept-Encoding": "gzip, deflate, br"}
+    resp, body, total = fetch(port, "/", dict(headers, **({"If-None-Match": etags["/"]} if "/" in etags else {})))
+    seen = {"/": resp.getheader("ETag")}
+    # The page body is only there on a 200; reuse the known asset URLs on a 304
+    urls = etags.get("urls") or re.findall(r'(?:href|src)="(/static/[^"]+)"', _html(resp, body))
+    for url in urls:
+        if url in etags:
+            continue  # Immutable, content-hashed: served from the browser cache
+        resp, _, wire = fetch(port, url, headers)
+        seen[url] = resp.getheader("ETag")
+        total += wire
+    seen["urls"] = urls
+    return total, seen
+
+
+def _html(resp, body):
+    if resp.getheader("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+    return body.decode()
+
+
+def main():
+    modules = sys.argv[1].split(",") if len(sys.argv) > 1 else ["rss"]
+    app = make_app(modules)
+    httpd = app.server(("127.0.0.1", 0), workers=2)
+    start_server(httpd)
+    port = httpd.server_port
+
+    # The old handler sent the whole page, uncompressed, every time
+    page = app.assets["/"].variants["identity"].decode()
+    css_url, js_url = re.findall(r'(?:href|src)="(/static/[^"]+)"', page)
+    css, js = (app.assets[url].variants["identity"].decode() for url in (css_url, js_url))
+    full = page.replace(f'<link rel="stylesheet" href="{css_url}">', "<style>" + css + "</style>")
+    full = full.replace(f'<script src="{js_url}"></script>', "<script>" + js + "</script>")
+    old_wire = len(full.encode()) + 150
+
+    first, etags = page_load(port)
+    repeat, _ = page_load(port, etags)
+
+    runs = 20000
+    start = time.process_time()
+    for _ in range(runs):
+        len(full.encode())
+        full.encode()
+    old_cpu = (time.process_time() - start) / runs
+    start = time.process_time()
+    for _ in range(runs):
+        asset = app.assets["/"]
+        negotiate("gzip, deflate, br", asset.variants)
+        asset.variants["gzip"]
+    new_cpu = (time.process_time() - start) / runs
+
+    httpd.shutdown()
+    httpd.close_gracefully()
+
+    print(f"modules:                   todos, {', '.join(modules)}")
+    print(f"bytes per load, old:       {old_wire:8d}")
+    print(f"bytes per load, first:     {first:8d} (compressed page + CSS + JS)")
+    print(f"bytes per load, repeat:    {repeat:8d} (page revalidated with a 304, assets cached)")
+    print(f"server CPU per page, old:  {old_cpu * 1e6:8.2f} us (encode twice)")
+    print(f"server CPU per page, new:  {new_cpu * 1e6:8.2f} us (lookup + negotiate)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Journal store benchmarks: write throughput under group commit and
+cold-start time with a large collection.
+
+    python benchmarks/bench_store.py [todos]
+"""
+
+import sys
+import tempfile
+import threading
+import time
+
+from common import ROOT  # noqa: F401  (puts the repo on sys.path)
+from ipadsuite.store import Collection
+
+
+def write_throughput(directory, threads, per_thread):
+    todos = Collection("todos")
+    todos.open(directory)
+
+    def writer(t):
+        for i in range(per_thread):
+            todos.commit("add", id=f"{t}-{i}", item={"text": "task", "done": False})
+
+    workers = [threading.Thread(target=writer, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    fsyncs = todos.journal.fsyncs
+    todos.close()
+    return threads * per_thread / elapsed, threads * per_thread / max(fsyncs, 1)
+
+
+def cold_start(directory, count, tail):
+    todos = Collection("todos", snapshot_every=10 ** 9, sync=False)
+    todos.open(directory)
+    for i in range(count):
+        todos.commit("add", id=str(i), item={"text": f"task {i}", "done": False})
+    journal_only = todos.seq
+    todos.journal.wait(todos.seq)
+
+    start = time.perf_counter()
+    replayed = Collection("todos")
+    replayed.open(directory)  # No snapshot yet: replays the whole journal
+    replay = time.perf_counter() - start
+    replayed.journal.close()
+
+    todos.snapshot()
+    for i in range(tail):
+        todos.commit("toggle", id=str(i))
+    todos.journal.close()  # Simulated crash: no shutdown snapshot
+
+    start = time.perf_counter()
+    reloaded = Collection("todos")
+    reloaded.open(directory)
+    snapshot_tail = time.perf_counter() - start
+    assert len(reloaded) == count and reloaded.seq == journal_only + tail
+    reloaded.journal.close()
+    return replay, snapshot_tail
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print("write throughput (sync commit, 2000 writes):")
+    for threads in (1, 4, 16, 64):
+        with tempfile.TemporaryDirectory() as d:
+            rate, batch = write_throughput(d, threads, 2000 // threads)
+        print(f"  {threads:3d} threads: {rate:9.0f} writes/s, {batch:6.1f} writes per fsync")
+
+    with tempfile.TemporaryDirectory() as d:
+        replay, snapshot_tail = cold_start(d, count, 1000)
+    print(f"cold start with {count} todos:")
+    print(f"  full journal replay:       {replay * 1e3:8.1f} ms")
+    print(f"  snapshot + 1000-record tail: {snapshot_tail * 1e3:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
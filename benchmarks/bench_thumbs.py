@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Note image pipeline: list-view payload bytes with originals vs 320px
+thumbnails, and server CPU per upload (request thread vs worker).
+
+    python benchmarks/bench_thumbs.py [images]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+from common import ROOT  # noqa: F401
+from ipadsuite.blobs import BlobStore
+from ipadsuite.thumbs import Thumbnailer
+
+from PIL import Image, ImageDraw
+
+
+def camera_photo(seed, size=(3264, 2448)):
+    """An 8 MP JPEG with enough detail to compress like a real photo."""
+    img = Image.effect_noise(size, 40 + seed).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for i in range(0, size[0], 97):
+        draw.line([(i, 0), (size[0] - i, size[1])], fill=(i % 255, seed * 30 % 255, 120), width=9)
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    photos = [camera_photo(i) for i in range(count)]
+    with tempfile.TemporaryDirectory() as d:
+        store = BlobStore(d)
+        thumbnailer = Thumbnailer(store)
+        request_cpu, worker_cpu, digests = 0.0, 0.0, []
+        for photo in photos:
+            start = time.process_time()
+            digest = store.put_bytes(photo)
+            future = thumbnailer.submit(digest)
+            request_cpu += time.process_time() - start
+            digests.append(digest)
+            worker_cpu += future.result()
+
+        original = sum(store.path(h).stat().st_size for h in digests)
+        thumbs = sum(os.path.getsize(thumbnailer.path(h, 320)[0]) for h in digests)
+        thumbnailer.close()
+
+    print(f"notes with images:       {count}")
+    print(f"list payload, originals: {original / 1024:10.1f} KiB")
+    print(f"list payload, 320px:     {thumbs / 1024:10.1f} KiB ({original / thumbs:.0f}x smaller)")
+    print(f"CPU per upload, request: {request_cpu / count * 1e3:10.1f} ms")
+    print(f"CPU per upload, worker:  {worker_cpu / count * 1e3:10.1f} ms (off the request thread)")
+
+
+if __name__ == "__main__":
+    main()
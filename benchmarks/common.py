@@ -0,0 +1,37 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+
+import atexit
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def make_app(modules=(), **options):
+    """create_app() with its data in a temporary directory, removed at exit."""
+    from ipadsuite import create_app
+
+    data = tempfile.mkdtemp(prefix="ipad-bench-")
+    atexit.register(shutil.rmtree, data, True)
+    return create_app(modules, data_dir=data, **options)
+
+
+def start_server(httpd):
+    """Run serve_forever() in a daemon thread and return the base URL."""
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    host, port = httpd.server_address[:2]
+    return f"http://127.0.0.1:{port}"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Load test: requests/sec and latency of GET /api/todos while other
+clients hit /api/rss and slow clients trickle large uploads.
+
+    python benchmarks/loadtest.py                  # pooled server
+    python benchmarks/loadtest.py --serial         # old single-threaded TCPServer
+    python benchmarks/loadtest.py --modules notes,smb
+"""
+
+import argparse
+import http.client
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+from common import make_app, percentile, start_server
+from stub_feeds import StubFeedServer
+
+
+def client(base, path, stop, latencies, errors):
+    url = urlparse(base)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            conn.getresponse().read()
+        except (OSError, http.client.HTTPException):
+            errors.append(path)
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def slow_upload(base, path, stop):
+    # A big upload over a bad link: headers, then one byte every 50 ms
+    url = urlparse(base)
+    with socket.create_connection((url.hostname, url.port)) as sock:
+        sock.sendall(f"POST {path} HTTP/1.1\r\nHost: x\r\nContent-Length: 10000000\r\n\r\n".encode())
+        while not stop.wait(0.05):
+            try:
+                sock.sendall(b"x")
+            except OSError:
+                return
+
+
+def build_server(app, serial, workers):
+    if serial:
+        # What main() used to do: one connection at a time, HTTP/1.0
+        class Serial(app.handler()):
+            protocol_version = "HTTP/1.0"
+
+        class SerialServer(socketserver.TCPServer):
+            closing = False
+            finished = []  # Request records nobody folds: only here to be appended to
+
+            def connection_idle(self, conn):
+                pass
+
+            connection_busy = connection_done = connection_idle
+
+        return SerialServer(("127.0.0.1", 0), Serial)
+    return app.server(("127.0.0.1", 0), workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", default="rss")
+    parser.add_argument("--serial", action="store_true")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--rss-clients", type=int, default=2)
+    parser.add_argument("--slow", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with StubFeedServer() as stub:
+        modules = [m for m in args.modules.split(",") if m]
+        app = make_app(modules, rss={"feeds": [stub.url("a", delay=0.5), stub.url("b", delay=0.5)], "ttl": 1})
+        if "rss" in modules:
+            app.feed_cache.start()
+        httpd = build_server(app, args.serial, args.workers)
+        base = start_server(httpd)
+
+        stop = threading.Event()
+        latencies, errors, threads = [], [], []
+        for _ in range(args.slow):
+            threads.append(threading.Thread(target=slow_upload, args=(base, "/api/todos", stop)))
+        if "rss" in modules:
+            for _ in range(args.rss_clients):
+                threads.append(threading.Thread(target=client, args=(base, "/api/rss", stop, [], errors)))
+        for _ in range(args.clients):
+            threads.append(threading.Thread(target=client, args=(base, "/api/todos", stop, latencies, errors)))
+        for t in threads:
+            t.daemon = True
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join(2)
+
+        httpd.shutdown()
+        if hasattr(httpd, "close_gracefully"):
+            httpd.close_gracefully()
+        else:
+            httpd.server_close()
+        if "rss" in modules:
+            app.feed_cache.stop(timeout=1)
+
+    mode = "serial" if args.serial else f"pooled ({args.workers} workers)"
+    print(f"server:       todos, {', '.join(modules)}, {mode}")
+    print(f"/api/todos:   {len(latencies) / args.duration:8.0f} req/s")
+    print(f"p50 latency:  {percentile(latencies, 50) * 1e3:8.2f} ms")
+    print(f"p99 latency:  {percentile(latencies, 99) * 1e3:8.2f} ms")
+    print(f"errors:       {len(errors)}")
+
+
+if __name__ == "__main__":
+    main()
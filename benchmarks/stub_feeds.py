@@ -0,0 +1,104 @@
+"""
+Stub RSS server for benchmarks
+Serves generated feeds on localhost so the feed code can be
+exercised without touching the network.
+
+    GET /feed/<name>?items=N&start=FIRST&delay=SECONDS&every=SECONDS&fail=1&etag=0
+
+Items are numbered from FIRST (default 0), newest first, one minute
+apart with the newest published when the server started. With ``every`` a new item
+appears every that many seconds; ``fail`` answers 500; ``etag=0``
+leaves out the ETag and Last-Modified headers.
+
+Responses carry an ETag, and a matching If-None-Match gets a 304.
+"""
+
+import http.server
+import threading
+import time
+from email.utils import formatdate
+from urllib.parse import urlparse, parse_qs
+
+
+def render_feed(name, items, start=0, newest=None):
+    newest = time.time() if newest is None else newest
+    entries = "".join(
+        f"<item><title>{name} item {i}</title>"
+        f"<link>http://stub.local/{name}/{i}</link>"
+        f"<guid>{name}-{i}</guid>"
+        f"<pubDate>{formatdate(newest - 60 * (start + items - 1 - i), usegmt=True)}</pubDate></item>"
+        for i in range(start + items - 1, start - 1, -1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<rss version="2.0"><channel><title>{name}</title>'
+        f"<link>http://stub.local/{name}</link>{entries}</channel></rss>"
+    ).encode()
+
+
+class StubFeedHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        name = parsed.path.rsplit("/", 1)[-1] or "feed"
+        items = int(query.get("items", ["10"])[0])
+        start = int(query.get("start", ["0"])[0])
+        delay = float(query.get("delay", ["0"])[0])
+        every = float(query.get("every", ["0"])[0])
+        if every:
+            start += int(time.time() / every) % 1_000_000
+
+        self.server.hits[name] = self.server.hits.get(name, 0) + 1
+        self.server.times.append(time.time())
+        if delay:
+            time.sleep(delay)
+        if query.get("fail") == ["1"]:
+            self.send_error(500)
+            return
+        with_etag = query.get("etag") != ["0"]
+
+        etag = f'"{name}-{start}-{items}"'
+        if with_etag and self.headers.get("If-None-Match") == etag:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        newest = int(time.time() / every) * every if every else self.server.started
+        body = render_feed(name, items, start, newest)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        if with_etag:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubFeedServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), StubFeedHandler)
+        self.hits = {}
+        self.times = []  # When each request arrived
+        self.started = int(time.time())  # Same body on every request, unless ``every``
+        self.not_modified = 0
+
+    def url(self, name, **params):
+        query = "&".join(f"{k}={v}" for k, v in params.items())
+        return f"http://127.0.0.1:{self.server_port}/feed/{name}" + (f"?{query}" if query else "")
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
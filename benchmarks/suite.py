@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: every API route of both servers, at several
+concurrency levels. Reports throughput, p50/p95/p99 latency, errors and
+the server's peak RSS per route, and writes it all to JSON so two
+commits can be compared.
+
+Each server runs on seeded data in a temporary directory: todos and
+notes already in the store, a temporary directory as SMB_SHARE and
+its feed registry pointing at the stub RSS server. By default the
+launcher scripts run on localhost in their own process; --inprocess
+builds the same apps in this process instead.
+
+Routes that use up what they act on (deletes, uploads, new feeds) get
+a fresh target every request: seeded ids first, then items made over
+HTTP before the request is timed. /api/events is timed to its headers.
+
+    python benchmarks/suite.py                        # suite-<commit>.json
+    python benchmarks/suite.py --levels 1,8 --duration 2 --out new.json
+    python benchmarks/suite.py --compare old.json     # and flag regressions
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from common import ROOT, percentile, start_server
+from ipadsuite.store import Collection
+from stub_feeds import StubFeedServer
+
+SERVERS = {
+    # launcher script -> modules it enables (todos always on)
+    "ipad-server.py": ("rss",),
+    "ipadservernoreq.py": ("notes", "smb"),
+}
+SEED_TODOS = 2000
+SEED_NOTES = 500
+SHARE_FILES = 500
+REGRESSION = 0.10  # --compare flags changes worse than 10%
+
+
+def seed(data, share, feed_urls):
+    """Data the servers start from: stored todos and notes, a share, the feed registry."""
+    todos = Collection("todos", index_by="done")
+    todos.open(data)
+    _, added = todos.batch([("add", {"item": {"text": f"task {i}", "done": i % 3 == 0,
+                                              "created": datetime.now().isoformat()}})
+                            for i in range(SEED_TODOS * 6)])
+    todos.close()
+    notes = Collection("notes")
+    notes.open(data)
+    _, notes_added = notes.batch([("add", {"item": {"text": f"nota {i}", "image": None,
+                                                    "created": datetime.now().isoformat(), "comments": []}})
+                                  for i in range(SEED_NOTES * 6)])
+    notes.close()
+    feeds = Collection("feeds")
+    feeds.open(data)
+    feeds.batch([("add", {"item": {"url": url, "interval": 300, "created": datetime.now().isoformat()}})
+                 for url in feed_urls])
+    feeds.close()
+
+    os.makedirs(os.path.join(share, "docs"))
+    for i in range(SHARE_FILES):
+        with open(os.path.join(share, "docs" if i % 5 == 0 else "", f"file{i:04d}.txt"), "w") as f:
+            f.write("x" * (i * 37 % 4096))
+    with open(os.path.join(share, "video.mp4"), "wb") as f:
+        f.write(os.urandom(1024 * 1024))
+    # The first SEED_TODOS are read and toggled, the rest deleted as the run goes
+    todo_ids = [rec["id"] for rec in added]
+    note_ids = [rec["id"] for rec in notes_added]
+    return {"todos": todo_ids[:SEED_TODOS], "todos_to_delete": todo_ids[SEED_TODOS:],
+            "notes": note_ids[:SEED_NOTES], "notes_to_delete": note_ids[SEED_NOTES:]}
+
+
+class Targets:
+    """Ids for the routes that use them up, made over HTTP once the seeded ones run out.
+
+    Factories run before the clock starts, so making a target is not
+    part of the measured request.
+    """
+
+    def __init__(self, port, pools):
+        self.port = port
+        self.pools = pools  # kind -> ids not used yet
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def request(self, method, path, data=None):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        if data is not None and not isinstance(data, bytes):
+            data = json.dumps(data).encode()
+        conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        payload = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{method} {path}: {response.status}")
+        return payload
+
+    def take(self, kind, make, fill=None):
+        """An unused id of ``kind``: from the pool (``fill()`` lists it the first time), else ``make()``."""
+        with self._lock:
+            if kind not in self.pools and fill is not None:
+                self.pools[kind] = fill()
+            if self.pools.get(kind):
+                return self.pools[kind].pop()
+        return make()
+
+
+def routes(modules, ids, port, stub):
+    """(label, request factory) for every route the server answers; factories get a Random."""
+    targets = Targets(port, {"todos": list(ids["todos_to_delete"]), "notes": list(ids["notes_to_delete"])})
+    counter = iter(range(10 ** 9))  # next() is atomic: unique names across client threads
+
+    def body(data):
+        return json.dumps(data).encode()
+
+    def make(path, data):
+        # POSTs ``data`` (or what ``data()`` returns) and gives the new id
+        return lambda: json.loads(targets.request("POST", path, data() if callable(data) else data))["id"]
+
+    page = targets.request("GET", "/").decode()
+    assets = sorted(set(re.findall(r"/static/[^\"'\s>]+", page)))
+    todo = ids["todos"]
+    table = [
+        ("GET /", lambda r: ("GET", "/", None)),
+        *[(f"GET /static/*.{asset.rsplit('.', 1)[1]}", lambda r, asset=asset: ("GET", asset, None))
+          for asset in assets],
+        ("GET /metrics", lambda r: ("GET", "/metrics", None)),
+        # Connection and headers; the stream itself stays with the event hub
+        ("GET /api/events", lambda r: ("GET", "/api/events", None)),
+        # A client that missed too much: answered at once with a reset
+        ("GET /api/events/poll", lambda r: ("GET", f"/api/events/poll?since={10 ** 9}", None)),
+        ("GET /api/todos", lambda r: ("GET", "/api/todos", None)),
+        ("GET /api/todos?done=false&limit=50", lambda r: ("GET", "/api/todos?done=false&limit=50", None)),
+        ("GET /api/search", lambda r: ("GET", "/api/search?q=task", None)),
+        ("POST /api/todos", lambda r: ("POST", "/api/todos", body({"text": "nuovo task"}))),
+        ("POST /api/todos/toggle", lambda r: ("POST", "/api/todos/toggle", body({"id": r.choice(todo)}))),
+        ("POST /api/todos/edit", lambda r: ("POST", "/api/todos/edit",
+                                            body({"id": r.choice(todo), "text": "modificato"}))),
+        ("POST /api/todos/delete", lambda r: ("POST", "/api/todos/delete", body(
+            {"id": targets.take("todos", make("/api/todos", {"text": "da cancellare"}))}))),
+        ("POST /api/todos/batch", lambda r: ("POST", "/api/todos/batch", body(
+            {"ops": [{"op": "toggle", "id": r.choice(todo)} for _ in range(20)]}))),
+    ]
+    if "notes" in modules:
+        note = ids["notes"]
+        image = json.loads(targets.request("POST", "/api/blobs", os.urandom(256 * 1024)))["hash"]
+        table += [
+            ("GET /api/notes", lambda r: ("GET", "/api/notes", None)),
+            ("POST /api/notes", lambda r: ("POST", "/api/notes", body({"text": "nuova nota"}))),
+            ("POST /api/notes/comment", lambda r: ("POST", "/api/notes/comment",
+                                                   body({"id": r.choice(note), "text": "ok"}))),
+            ("POST /api/notes/delete", lambda r: ("POST", "/api/notes/delete", body(
+                {"id": targets.take("notes", make("/api/notes", {"text": "da cancellare"}))}))),
+            ("POST /api/notes/batch", lambda r: ("POST", "/api/notes/batch", body(
+                {"ops": [{"op": "comment", "id": r.choice(note), "text": "ok"} for _ in range(20)]}))),
+            # A new blob every time: the same bytes would only be hashed and dropped
+            ("POST /api/blobs (32 KiB)", lambda r: ("POST", "/api/blobs", r.randbytes(32 * 1024))),
+            ("GET /blobs/{digest}", lambda r: ("GET", f"/blobs/{image}", None)),
+        ]
+    if "smb" in modules:
+        table += [
+            ("GET /api/smb", lambda r: ("GET", "/api/smb?path=&limit=200", None)),
+            ("GET /api/smb?path=docs", lambda r: ("GET", "/api/smb?path=docs&sort=size&order=desc", None)),
+            ("GET /api/smb/file", lambda r: ("GET", "/api/smb/file?path=video.mp4", None)),
+        ]
+    if "rss" in modules:
+        stored = [item["id"] for item in json.loads(targets.request("GET", "/api/rss?limit=200"))["items"]]
+
+        def new_feed():
+            # Its first fetch goes to the stub like any other feed
+            return {"url": stub.url(f"suite-{next(counter)}", items=5), "interval": 3600}
+
+        def added_feeds():
+            # The deletes start with the feeds POST /api/feeds added
+            feeds = json.loads(targets.request("GET", "/api/feeds"))["feeds"]
+            return [feed["id"] for feed in feeds if "/feed/suite-" in feed["url"]]
+
+        table += [
+            ("GET /api/rss", lambda r: ("GET", "/api/rss", None)),
+            ("GET /api/rss?limit=30", lambda r: ("GET", "/api/rss?limit=30&read=false", None)),
+            ("GET /api/feeds", lambda r: ("GET", "/api/feeds", None)),
+            # Stored items, flipped both ways, so every request changes something
+            ("POST /api/rss/read", lambda r: ("POST", "/api/rss/read", body(
+                {"ids": r.sample(stored, min(10, len(stored))), "read": r.random() < 0.5}))),
+            ("POST /api/feeds", lambda r: ("POST", "/api/feeds", body(new_feed()))),
+            ("POST /api/feeds/delete", lambda r: ("POST", "/api/feeds/delete", body(
+                {"id": targets.take("feeds", make("/api/feeds", new_feed), added_feeds)}))),
+        ]
+    return table
+
+
+def rss_mib(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def measure(port, pid, factory, concurrency, duration):
+    """Closed loop: ``concurrency`` keep-alive clients for ``duration`` seconds."""
+    stop = threading.Event()
+    latencies, errors = [], []
+    peak = [rss_mib(pid)]
+
+    def client(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine, failed = [], 0
+        while not stop.is_set():
+            method, path, data = factory(rng)
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                if response.getheader("Content-Type") == "text/event-stream":
+                    conn.close()  # Never ends: timed to the headers, next request on a new connection
+                else:
+                    response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            mine.append(time.perf_counter() - started)
+        conn.close()
+        latencies.extend(mine)
+        errors.append(failed)
+
+    def sample():
+        while not stop.wait(0.05):
+            peak[0] = max(peak[0], rss_mib(pid))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    threads.append(threading.Thread(target=sample))
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {
+        "requests": len(latencies),
+        "throughput": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1e3, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1e3, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1e3, 3),
+        "errors": sum(errors),
+        "peak_rss_mib": round(peak[0], 1),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(port, path, ready, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", path)
+            response = conn.getresponse()
+            data = response.read()
+            conn.close()
+            if response.status == 200 and ready(data):
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} not ready ({path})")
+
+
+class Launched:
+    """A launcher script on localhost, in its own process."""
+
+    def __init__(self, script, data, share, workers):
+        self.port = free_port()
+        env = dict(os.environ, IPAD_PORT=str(self.port), IPAD_DATA=data, IPAD_SMB_SHARE=share,
+                   IPAD_WORKERS=str(workers), IPAD_ACCESS_LOG=os.devnull)
+        self.process = subprocess.Popen([sys.executable, str(ROOT / script)], env=env, cwd=ROOT,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.pid = self.process.pid
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(10)
+
+
+class InProcess:
+    """The same app built with create_app() and served from this process."""
+
+    def __init__(self, script, data, share, workers):
+        from ipadsuite import create_app
+
+        self.app = create_app(SERVERS[script], data_dir=data, smb={"share": share})
+        self.app.start()
+        self.httpd = self.app.server(("127.0.0.1", 0), workers=workers)
+        start_server(self.httpd)
+        self.port, self.pid = self.httpd.server_port, os.getpid()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.close_gracefully()
+        self.app.stop()
+
+
+def run_server(script, args, stub):
+    modules = SERVERS[script]
+    work = tempfile.mkdtemp(prefix="ipad-suite-")
+    data, share = os.path.join(work, "data"), os.path.join(work, "share")
+    os.makedirs(share)
+    feed_urls = [stub.url(f"feed{i}", items=50) for i in range(4)]
+    ids = seed(data, share, feed_urls)
+    server = (InProcess if args.inprocess else Launched)(script, data, share, args.workers)
+    results = []
+    try:
+        wait_until(server.port, "/", lambda data: True)
+        if "rss" in modules:
+            # Measure once the refresher has stored the stub feeds
+            wait_until(server.port, "/api/rss?limit=1", lambda data: json.loads(data)["items"])
+        for label, factory in routes(modules, ids, server.port, stub):
+            for concurrency in args.levels:
+                result = {"server": script, "route": label, "concurrency": concurrency,
+                          **measure(server.port, server.pid, factory, concurrency, args.duration)}
+                results.append(result)
+                print(f"  {label:38} {concurrency:3d} {result['throughput']:9.0f} {result['p50_ms']:8.2f} "
+                      f"{result['p95_ms']:8.2f} {result['p99_ms']:8.2f} {result['errors']:6d} "
+                      f"{result['peak_rss_mib']:8.1f}", flush=True)
+    finally:
+        server.close()
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old, new):
+    """Print throughput and p99 changes per (server, route, concurrency); returns the regressions."""
+    before = {(r["server"], r["route"], r["concurrency"]): r for r in old["results"]}
+    regressions = []
+    print(f"\nagainst {old.get('commit', '?')} ({old.get('date', '?')}):")
+    if old.get("mode") != new["mode"]:
+        print(f"  (measured {old.get('mode')}, now {new['mode']}: numbers are not comparable)")
+    print(f"  {'route':38} {'c':>3} {'req/s':>8} {'p99':>8}")
+    matched = 0
+    for r in new["results"]:
+        o = before.get((r["server"], r["route"], r["concurrency"]))
+        if o is None or not o["throughput"] or not o["p99_ms"]:
+            continue
+        matched += 1
+        speed = r["throughput"] / o["throughput"] - 1
+        tail = r["p99_ms"] / o["p99_ms"] - 1
+        worse = speed < -REGRESSION or tail > REGRESSION
+        if worse:
+            regressions.append(r)
+        print(f"  {r['route']:38} {r['concurrency']:3d} {speed:+8.0%} {tail:+8.0%}{'  <-- slower' if worse else ''}")
+    if not matched:
+        print("  no route measured at the same concurrency in both")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--servers", default=",".join(SERVERS), help="launcher scripts to run")
+    parser.add_argument("--levels", default="1,4,16", help="concurrent clients, comma separated")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per route and level")
+    parser.add_argument("--workers", type=int, default=16, help="server worker threads")
+    parser.add_argument("--inprocess", action="store_true", help="serve from this process")
+    parser.add_argument("--out", help="JSON results (default suite-<commit>.json)")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.levels.split(",")]
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": "inprocess" if args.inprocess else "localhost",
+        "levels": args.levels,
+        "duration": args.duration,
+        "workers": args.workers,
+        "results": [],
+    }
+    with StubFeedServer() as stub:
+        for script in args.servers.split(","):
+            print(f"{script} (todos, {', '.join(SERVERS[script])}), {report['mode']}:")
+            print(f"  {'route':38} {'c':>3} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                  f"{'errors':>6} {'RSS MiB':>8}")
+            report["results"] += run_server(script, args, stub)
+
+    out = args.out or f"suite-{commit}.json"
+    with open(out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nwritten to {out}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
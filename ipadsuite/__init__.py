@@ -0,0 +1,9 @@
+"""
+iPad Suite
+Todo list, notes, RSS and an SMB share browser for an old iPad,
+served by one small Python process.
+"""
+
+from .app import App, create_app
+
+__all__ = ["App", "create_app"]
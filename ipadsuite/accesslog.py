@@ -0,0 +1,42 @@
+"""
+Access log
+One JSON line per request. The server hands over the requests that
+finished since the last flush, about once a second, so formatting
+and writing happen off the request threads.
+
+    {"ts": "2026-10-18T10:42:03.024", "client": "192.168.1.20", "method": "GET",
+     "path": "/api/todos", "status": 200, "bytes": 512, "ms": 0.41}
+"""
+
+import json
+import threading
+import time
+
+
+class AccessLog:
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, requests):
+        """Write a batch of finished requests, as recorded by serving.RequestHandler."""
+        lines = []
+        second, stamp = None, ""
+        for ts, client, method, path, _, status, _, sent, elapsed in requests:
+            if int(ts) != second:  # Lines in a batch mostly share the same second
+                second = int(ts)
+                stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+            lines.append(
+                f'{{"ts": "{stamp}.{int(ts * 1000) % 1000:03d}", "client": "{client}", '
+                f'"method": {json.dumps(method, ensure_ascii=False)}, '
+                f'"path": {json.dumps(path, ensure_ascii=False)}, '
+                f'"status": {status}, "bytes": {sent}, "ms": {elapsed * 1000:.2f}}}\n'
+            )
+        with self._lock:
+            self.stream.write("".join(lines))
+            self.stream.flush()
+
+    def close(self):
+        with self._lock:
+            self.stream.flush()
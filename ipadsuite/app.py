@@ -0,0 +1,246 @@
+"""
+App factory
+create_app() builds one server from the core (todos, push events,
+search, /metrics) plus the optional modules in ipadsuite/modules:
+rss, notes and smb. A module is only imported when it is enabled, so
+without "rss" feedparser is never loaded.
+
+    python -m ipadsuite                       # IPAD_MODULES=rss,notes,smb
+    IPAD_MODULES=notes,smb python -m ipadsuite
+"""
+
+import importlib
+import os
+import socket
+import sys
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from . import metrics
+from .accesslog import AccessLog
+from .bodies import BodyError, read_json
+from .events import EventHub, long_poll, stream_events
+from .page import build_page
+from .payloads import CollectionPayload, dumps, send_collection, send_json_bytes, send_page
+from .routing import Router, split_target
+from .search import SearchIndex, search_payload, watch_collection
+from .serving import PooledHTTPServer, RequestHandler, serve
+from .static import send_asset
+from .store import Collection
+
+PORT = int(os.environ.get("IPAD_PORT", 8000))
+HOST = "0.0.0.0"
+WORKERS = int(os.environ.get("IPAD_WORKERS", 16))  # Thread che servono le richieste
+DATA_DIR = Path(os.environ.get("IPAD_DATA", Path(__file__).resolve().parent.parent / "data"))
+ACCESS_LOG = os.environ.get("IPAD_ACCESS_LOG")  # File per l'access log (default: stdout)
+MODULES = tuple(m for m in os.environ.get("IPAD_MODULES", "rss,notes,smb").split(",") if m)
+
+CORS = {"Access-Control-Allow-Origin": "*"}
+MAX_BATCH = 1000  # Operazioni per POST /api/<name>/batch
+
+
+class AppHandler(RequestHandler):
+    """Dispatches every method through the app's route table."""
+
+    router = None  # Set by App.handler()
+    max_body = 64 * 1024  # Per le route senza un body_limit proprio
+
+    def dispatch(self):
+        path, qs = split_target(self.path)
+        route, params = self.router.match(self.command, path)
+        if route is None:
+            if params is None:
+                self.send_error(404)
+                return
+            self.send_response(405)  # The path exists, with other methods
+            self.send_header("Allow", ", ".join(params))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        query = parse_qs(qs) if qs else {}
+        try:
+            route.handler(self, query, **params)
+        except BodyError as e:
+            self.reject_body(e)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = dispatch
+
+    def body_limit(self):
+        # The same split as dispatch(), so the limit is the dispatched route's
+        route, _ = self.router.match(self.command, split_target(self.path)[0])
+        if route is None or route.body_limit is None:
+            return self.max_body
+        return route.body_limit
+
+    def route_label(self, path):
+        return self.router.label(path)
+
+    def send_json(self, data):
+        send_json_bytes(self, dumps(data), headers=CORS)
+
+
+class App:
+    """Storage, push events, search and routes of one server."""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = Path(data_dir)
+        self.router = Router()
+        self.hub = EventHub()  # Notifiche push verso i browser aperti (SSE / long-poll)
+        self.search_index = SearchIndex()  # Ricerca full-text su todo, note e notizie
+        self.modules = []
+        self.tabs = []  # Page sections, see page.py
+        self.caches = {}  # name -> object with hits/misses, for /metrics
+        self.on_start = []
+        self.on_stop = []
+        self._collections = []  # (collection, search kind, text_of)
+        self.assets = {}
+
+        self.route("GET", "/api/events")(lambda req, query: stream_events(req, self.hub))
+        self.route("GET", "/api/events/poll")(
+            lambda req, query: long_poll(req, self.hub, query.get("since", [None])[0]))
+        self.route("GET", "/api/search")(
+            lambda req, query: req.send_json(search_payload(self.search_index, query)))
+        self.route("GET", "/metrics")(lambda req, query: metrics.send_metrics(req))
+
+    def route(self, methods, pattern, body_limit=None):
+        """Decorator: ``handler(request, query, **params)`` answers ``methods`` on ``pattern``."""
+        def register(handler):
+            self.router.add(methods, pattern, handler, body_limit)
+            return handler
+        return register
+
+    def collection(self, name, kind, text_of, index_by=None):
+        """A journaled collection served at GET /api/<name>, pushed and indexed on change.
+
+        Returns (collection, encoded payload).
+        """
+        collection = Collection(name, index_by=index_by)
+        payload = CollectionPayload(collection, name)  # Risposta già codificata per revisione
+        collection.listeners.append(lambda rec: self.hub.publish(name, rev=rec["seq"]))
+        self._collections.append((collection, kind, text_of))
+        self.caches[f"{name}_json"] = payload
+
+        @self.route("GET", f"/api/{name}")
+        def get_all(req, query):
+            # ?since=rev returns only the changes, ?limit=&cursor= one page
+            if "limit" in query or "cursor" in query or "done" in query:
+                send_page(req, collection, query, CORS)
+            else:
+                send_collection(req, payload, query.get("since", [None])[0], CORS)
+
+        return collection, payload
+
+    def batch_route(self, name, collection, prepare):
+        """POST /api/<name>/batch {"ops": [{"op": ..., ...}, ...]}: all in one change.
+
+        ``prepare(op)`` turns one operation of the body into the (op,
+        fields) of ``Collection.batch()``, raising ValueError when it is
+        not valid: then nothing is applied and the answer is a 400. The
+        answer is {"rev", "ids"}, the id of each operation in order (null
+        for one skipped because its item does not exist).
+        """
+        @self.route("POST", f"/api/{name}/batch", body_limit=MAX_BATCH * 2048)
+        def batch(req, query):
+            data = read_json(req.body())
+            ops = data.get("ops") if isinstance(data, dict) else None
+            if not isinstance(ops, list) or len(ops) > MAX_BATCH:
+                req.send_error(400, f"ops must be a list of at most {MAX_BATCH} operations")
+                return
+            prepared = []
+            for i, op in enumerate(ops):
+                try:
+                    prepared.append(prepare(op if isinstance(op, dict) else {}))
+                except ValueError as e:
+                    req.send_error(400, f"ops[{i}]: {e}")
+                    return
+            rev, records = collection.batch(prepared)
+            req.send_json({"rev": rev, "ids": [rec and rec["id"] for rec in records]})
+
+    def add_tab(self, id, label, html, css="", js=""):
+        self.tabs.append((id, label, html, css, js))
+
+    def load(self, name, **options):
+        """Import and set up the optional module ``name`` (rss, notes, smb)."""
+        try:
+            module = importlib.import_module(f"{__package__}.modules.{name}")
+        except ModuleNotFoundError as e:
+            if e.name != f"{__package__}.modules.{name}":
+                raise  # The module exists, something it imports does not
+            raise ValueError(f"Unknown module: {name}") from None
+        module.setup(self, **options)
+        self.modules.append(name)
+
+    def build(self):
+        """Compress the page once all modules added their tabs, and route it."""
+        self.assets = build_page(self.tabs)
+        page = self.assets["/"]
+        self.route(("GET", "HEAD"), "/")(lambda req, query: send_asset(req, page))
+        self.route(("GET", "HEAD"), "/index.html")(lambda req, query: send_asset(req, page))
+
+        @self.route(("GET", "HEAD"), "/static/{name}")
+        def get_static(req, query, name):
+            asset = self.assets.get("/static/" + name)
+            if asset is None:
+                req.send_error(404)
+                return
+            send_asset(req, asset)
+
+        # /metrics: valori letti solo quando Prometheus li chiede
+        metrics.cache_metrics(self.caches)
+        metrics.callback("gauge", "ipad_event_subscribers", "Open SSE and long-poll connections.", [],
+                         lambda: [((), self.hub.subscribers)])
+        metrics.callback("gauge", "ipad_search_documents", "Documents in the search index.", [],
+                         lambda: [((), len(self.search_index))])
+
+    def handler(self):
+        """RequestHandler class bound to this app's routes."""
+        return type("Handler", (AppHandler,), {"router": self.router})
+
+    def start(self):
+        for collection, kind, text_of in self._collections:
+            collection.open(self.data_dir)
+            watch_collection(self.search_index, collection, kind, text_of)
+        self.hub.start()
+        for hook in self.on_start:
+            hook()
+
+    def stop(self):
+        for hook in reversed(self.on_stop):
+            hook()
+        self.hub.close()
+        for collection, _, _ in self._collections:
+            collection.close()
+
+    def server(self, address, workers=WORKERS, access_log=None):
+        return PooledHTTPServer(address, self.handler(), workers=workers, access_log=access_log)
+
+
+def create_app(modules=MODULES, data_dir=DATA_DIR, **options):
+    """App with the todo list and the optional ``modules``.
+
+    ``options`` are per module: ``create_app(["rss"], rss={"feeds": [...]})``.
+    """
+    from .modules import todos
+
+    app = App(data_dir)
+    todos.setup(app)
+    for name in modules:
+        app.load(name, **options.get(name, {}))
+    app.build()
+    return app
+
+
+def main(modules=MODULES):
+    app = create_app(modules)
+    print(f"\n🚀 iPad Suite ({', '.join(['todos', *app.modules])})")
+    print(f"📍 http://{HOST}:{PORT}")
+    try:
+        print(f"🌐 Accedi: http://{socket.gethostbyname(socket.gethostname())}:{PORT}")
+    except OSError:
+        pass
+    print(f"⚠️  Ctrl+C per fermare\n")
+
+    app.start()
+    access_log = AccessLog(open(ACCESS_LOG, "a", encoding="utf-8") if ACCESS_LOG else sys.stdout)
+    serve(app.server((HOST, PORT), access_log=access_log))
+    app.stop()
@@ -0,0 +1,154 @@
+"""
+Content-addressed blob store
+Note images are stored on disk under their SHA-256 and served with
+sendfile(), so they never travel inside the notes JSON.
+
+    <dir>/<first 2 hex>/<sha256>
+"""
+
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from . import metrics
+from .static import IMMUTABLE, etag_matches
+
+CHUNK = 64 * 1024
+HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Magic numbers of the image formats an iPad can upload
+SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG", "image/png"),
+    (0, b"GIF8", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (4, b"ftypheic", "image/heic"),
+    (4, b"ftypmif1", "image/heic"),
+]
+
+
+def sniff_type(head):
+    for offset, magic, ctype in SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return ctype
+    return "application/octet-stream"
+
+
+class BlobStore:
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, digest):
+        """Path of a blob, or None if ``digest`` is not a valid hash."""
+        if not HASH_RE.match(digest):
+            return None
+        return self.directory / digest[:2] / digest
+
+    def exists(self, digest):
+        path = self.path(digest)
+        return path is not None and path.exists()
+
+    def writer(self):
+        """A BlobWriter for content that arrives piece by piece."""
+        return BlobWriter(self)
+
+    def put_stream(self, rfile, length=None):
+        """Copy ``length`` bytes (or up to EOF) from ``rfile`` to disk in chunks; returns the hash."""
+        with self.writer() as blob:
+            remaining = length
+            while remaining is None or remaining:
+                chunk = rfile.read(CHUNK if remaining is None else min(CHUNK, remaining))
+                if not chunk:
+                    if remaining is None:
+                        break
+                    raise ConnectionError("upload truncated")
+                blob.write(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+            return blob.commit()
+
+    def put_bytes(self, data):
+        return self.put_stream(io.BytesIO(data), len(data))
+
+
+class BlobWriter:
+    """Writes a blob to a temp file while hashing it; commit() moves it in place.
+
+    Used as a context manager: an uncommitted temp file is removed.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.size = 0
+        self._sha = hashlib.sha256()
+        tmp_dir = store.directory / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._tmp):
+            os.unlink(self._tmp)
+
+    def write(self, data):
+        self._sha.update(data)
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        digest = self._sha.hexdigest()
+        final = self.store.path(digest)
+        final.parent.mkdir(exist_ok=True)
+        os.replace(self._tmp, final)  # Same content, same name: overwriting is harmless
+        return digest
+
+
+def send_blob(handler, store, digest, immutable=True):
+    """Serve a blob with a strong ETag, long-lived caching and zero-copy sendfile."""
+    path = store.path(digest)
+    if path is None or not path.exists():
+        handler.send_error(404)
+        return
+    send_file(handler, path, f'"{digest}"', immutable=immutable)
+
+
+def send_file(handler, path, etag, ctype=None, immutable=True):
+    """Send a file: 304 on a matching If-None-Match, else sendfile().
+
+    Cached for a year unless ``immutable`` is false: then the browser
+    revalidates it every time.
+    """
+    if etag_matches(handler.headers.get("If-None-Match"), etag):
+        handler.send_response(304)
+        handler.send_header("ETag", etag)
+        handler.send_header("Content-Length", "0")
+        handler.end_headers()
+        return
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if ctype is None:
+            ctype = sniff_type(f.read(16))
+            f.seek(0)
+        handler.send_response(200)
+        handler.send_header("Content-Type", ctype)
+        handler.send_header("Content-Length", str(size))
+        handler.send_header("ETag", etag)
+        handler.send_header("Cache-Control", IMMUTABLE if immutable else "no-cache")
+        handler.end_headers()
+        if handler.command != "HEAD":
+            started = time.perf_counter()
+            handler.connection.sendfile(f)
+            metrics.SEND_SECONDS.labels("blob").observe(time.perf_counter() - started)
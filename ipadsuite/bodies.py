@@ -0,0 +1,174 @@
+"""
+Request bodies
+Bodies are read in chunks through a reader that knows the route's
+size limit: a Content-Length over the limit is refused with 413
+before anything is read, and a chunked body is cut off as soon as it
+goes over. Inline base64 note images are decoded straight into the
+blob store while the JSON is read, so they are never held in memory.
+"""
+
+import binascii
+import re
+
+from .payloads import loads
+
+CHUNK = 64 * 1024
+IMAGE_RE = re.compile(rb'"image"\s{0,8}:\s{0,8}"data:')
+TAIL = 32  # Bytes kept back between chunks, so IMAGE_RE can match across them
+MAX_HEADER = 256  # "image/jpeg;base64" and friends
+
+
+class BodyError(Exception):
+    """A body we refuse; ``status`` is the HTTP error to answer with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class BodyReader:
+    """File-like view of a request body (Content-Length or chunked), at most ``limit`` bytes."""
+
+    def __init__(self, rfile, headers, limit):
+        self.rfile = rfile
+        self.limit = limit
+        self.total = 0
+        self.chunked = "chunked" in headers.get("Transfer-Encoding", "").lower()
+        self._left = 0  # Bytes left in the body (or in the current chunk)
+        self._done = False
+        if not self.chunked:
+            length = headers.get("Content-Length")
+            try:
+                self._left = int(length) if length else 0
+            except ValueError:
+                raise BodyError(400, "Bad Content-Length")
+            if self._left < 0:
+                raise BodyError(400, "Bad Content-Length")
+            if self._left > limit:
+                raise BodyError(413, f"Body larger than {limit} bytes")
+            self._done = self._left == 0
+
+    @property
+    def done(self):
+        """True once the whole body has been read."""
+        return self._done
+
+    def read(self, size=CHUNK):
+        if self._done:
+            return b""
+        if self.chunked and not self._left:
+            self._next_chunk()
+            if self._done:
+                return b""
+        data = self.rfile.read(min(size, self._left))
+        if not data:
+            raise ConnectionError("body truncated")
+        self._left -= len(data)
+        self.total += len(data)
+        if self.total > self.limit:
+            raise BodyError(413, f"Body larger than {self.limit} bytes")
+        if not self._left:
+            if self.chunked:
+                self.rfile.readline(8)  # CRLF after the chunk data
+            else:
+                self._done = True
+        return data
+
+    def _next_chunk(self):
+        line = self.rfile.readline(80)
+        try:
+            self._left = int(line.split(b";")[0], 16)
+        except ValueError:
+            raise BodyError(400, "Bad chunk size")
+        if self._left == 0:
+            while self.rfile.readline(8192) not in (b"\r\n", b"\n", b""):
+                pass  # Trailer headers: ignored
+            self._done = True
+
+    def __iter__(self):
+        while True:
+            chunk = self.read()
+            if not chunk:
+                return
+            yield chunk
+
+
+def read_json(reader, store=None):
+    """Parse a JSON body read in chunks ({} when empty).
+
+    With a blob ``store``, an inline ``"image": "data:...;base64,..."``
+    is decoded to the store while reading and replaced by its hash.
+    """
+    body = bytearray()
+    chunks = iter(reader) if store is None else _extract_images(reader, store)
+    for chunk in chunks:
+        body += chunk
+    if not body.strip():
+        return {}
+    try:
+        return loads(body)
+    except ValueError:
+        raise BodyError(400, "Invalid JSON")
+
+
+def _extract_images(reader, store):
+    """Yield the JSON of ``reader`` with inline base64 images swapped for blob hashes."""
+    pending = b""
+    for chunk in reader:
+        pending += chunk
+        while True:
+            match = IMAGE_RE.search(pending)
+            if match is None:
+                break
+            yield pending[:match.end() - len("data:")]
+            pending = pending[match.end():]
+            # data:<type>;base64,<payload>"
+            while b"," not in pending and len(pending) < MAX_HEADER:
+                chunk = reader.read()
+                if not chunk:
+                    break
+                pending += chunk
+            comma = pending.find(b",", 0, MAX_HEADER)
+            header = pending[:comma]
+            if comma < 0 or not header.endswith(b";base64") or b'"' in header:
+                yield b"data:"  # Not something we can decode: leave it as it is
+                continue
+            buf = bytearray(memoryview(pending)[comma + 1:])
+            chunk = pending = None  # Only ``buf`` is kept while decoding
+            digest, pending = _decode_to_store(buf, reader, store)
+            yield digest.encode() + b'"'
+        if len(pending) > TAIL:
+            yield pending[:-TAIL]
+            pending = pending[-TAIL:]
+    yield pending
+
+
+def _decode_to_store(buf, reader, store):
+    """Decode base64 up to the closing quote into ``store``: (hash, what follows the quote).
+
+    ``buf`` is a bytearray that is consumed and refilled in place.
+    """
+    with store.writer() as blob:
+        while True:
+            end = buf.find(b'"')
+            stop = len(buf) if end < 0 else end
+            if end < 0 and buf.endswith(b"\\"):
+                stop -= 1  # Escape split across chunks: wait for the next byte
+            if buf.find(b"\\", 0, stop) >= 0:
+                unescaped = buf[:stop].replace(b"\\/", b"/")  # JSON may escape slashes
+                buf[:stop] = unescaped
+                stop = len(unescaped)
+            cut = stop if end >= 0 else stop - stop % 4
+            try:
+                with memoryview(buf)[:cut] as view:
+                    blob.write(binascii.a2b_base64(view))
+            except binascii.Error:
+                raise BodyError(400, "Invalid base64 image")
+            del buf[:cut]  # Leaves the partial quantum (or the closing quote) in front
+            if end >= 0:
+                return blob.commit(), bytes(buf[1:])
+            size = len(buf)
+            buf += reader.read()  # No name for the chunk: it is freed right after the copy
+            if len(buf) == size:
+                raise ConnectionError("body truncated")
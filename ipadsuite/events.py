@@ -0,0 +1,288 @@
+"""
+Event push
+/api/events (Server-Sent Events) and /api/events/poll (long-poll
+fallback for old Safari) tell the page when todos, notes or feeds
+change. Subscriber sockets are handed over to one selector thread,
+so idle connections do not each hold a worker thread.
+"""
+
+import json
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+POLL_HEADERS = (
+    "HTTP/1.1 200 OK\r\n"
+    "Content-Type: application/json\r\n"
+    "Cache-Control: no-store\r\n"
+    "Connection: close\r\n"
+    "Content-Length: {length}\r\n\r\n"
+)
+
+
+class Wakeup:
+    """Socketpair that wakes a selector thread up from other threads.
+
+    ``reader`` is registered with the selector; the thread calls
+    ``drain()`` when it turns up ready.
+    """
+
+    def __init__(self, selector):
+        self.reader, self._writer = socket.socketpair()
+        self.reader.setblocking(False)
+        self._writer.setblocking(False)
+        selector.register(self.reader, selectors.EVENT_READ)
+
+    def wake(self):
+        try:
+            self._writer.send(b"x")
+        except (BlockingIOError, OSError):
+            pass  # Already awake
+
+    def drain(self):
+        try:
+            while self.reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        self.reader.close()
+        self._writer.close()
+
+
+class _Subscriber:
+    __slots__ = ("sock", "kind", "buffer", "since", "deadline", "closing")
+
+    def __init__(self, sock, kind, since=0, deadline=None):
+        self.sock = sock
+        self.kind = kind          # "sse" or "poll"
+        self.buffer = bytearray()
+        self.since = since        # Long-poll: last event id the client has
+        self.deadline = deadline  # Long-poll: when to answer with no events
+        self.closing = False      # Close once the buffer is flushed
+
+
+class EventHub:
+
+    def __init__(self, history=512, heartbeat=15, poll_timeout=25, max_buffer=256 * 1024):
+        self.heartbeat = heartbeat
+        self.poll_timeout = poll_timeout
+        self.max_buffer = max_buffer
+        self.last_id = 0
+        self._history = deque(maxlen=history)  # (id, event dict)
+        self._lock = threading.Lock()
+        self._incoming = []   # Subscribers waiting to be registered
+        self._outgoing = []   # Events waiting to be fanned out
+        self._subs = {}
+        self._selector = selectors.DefaultSelector()
+        self._wakeup = Wakeup(self._selector)
+        self._running = False
+        self._thread = None
+
+    @property
+    def subscribers(self):
+        return len(self._subs)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="event-hub", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._running = False
+        self._wakeup.wake()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def publish(self, type, **data):
+        """Queue an event for every subscriber (safe from any thread)."""
+        with self._lock:
+            self.last_id += 1
+            event = {"id": self.last_id, "type": type, **data}
+            self._history.append((self.last_id, event))
+            self._outgoing.append(event)
+        self._wakeup.wake()
+
+    def since(self, last_id):
+        """Events after ``last_id``, or None if some were dropped (or the server restarted)."""
+        with self._lock:
+            if last_id == self.last_id:
+                return []
+            if last_id > self.last_id:
+                return None
+            if not self._history or self._history[0][0] > last_id + 1:
+                return None
+            return [event for event_id, event in self._history if event_id > last_id]
+
+    def attach_sse(self, sock, last_id=None):
+        """Take over a socket whose SSE headers were already sent."""
+        sub = _Subscriber(sock, "sse")
+        sub.buffer += b"retry: 3000\n\n"
+        if last_id is not None:
+            backlog = self.since(last_id)
+            if backlog is None:
+                backlog = [{"id": self.last_id, "type": "reset"}]
+            for event in backlog:
+                sub.buffer += self._frame(event)
+        self._attach(sub)
+
+    def attach_poll(self, sock, since):
+        """Take over a long-poll request; it is answered by the next event or a timeout."""
+        self._attach(_Subscriber(sock, "poll", since, time.monotonic() + self.poll_timeout))
+
+    @staticmethod
+    def poll_body(events, last_id, reset=False):
+        body = {"events": events, "last": last_id}
+        if reset:
+            body["reset"] = True
+        return json.dumps(body).encode()
+
+    def _attach(self, sub):
+        sub.sock.setblocking(False)
+        with self._lock:
+            self._incoming.append(sub)
+        self._wakeup.wake()
+
+    @staticmethod
+    def _frame(event):
+        return f"id: {event['id']}\ndata: {json.dumps(event)}\n\n".encode()
+
+    def _poll_response(self, sub, events, last_id):
+        if events:
+            last_id = events[-1]["id"]
+        body = self.poll_body(events or [], last_id, reset=events is None)
+        sub.buffer += POLL_HEADERS.format(length=len(body)).encode() + body
+        sub.closing = True
+        sub.deadline = None
+
+    # Selector thread
+
+    def _run(self):
+        next_beat = time.monotonic() + self.heartbeat
+        while self._running:
+            now = time.monotonic()
+            deadlines = [s.deadline for s in self._subs.values() if s.deadline]
+            timeout = max(0.0, min([next_beat, *deadlines]) - now)
+            for key, mask in self._selector.select(timeout):
+                if key.fileobj is self._wakeup.reader:
+                    self._wakeup.drain()
+                    continue
+                sub = self._subs.get(key.fileobj)
+                if sub is None:
+                    continue
+                if mask & selectors.EVENT_READ and not self._readable(sub):
+                    continue
+                if mask & selectors.EVENT_WRITE:
+                    self._flush(sub)
+
+            with self._lock:
+                incoming, self._incoming = self._incoming, []
+                outgoing, self._outgoing = self._outgoing, []
+                last_id = self.last_id
+            for sub in incoming:
+                self._subs[sub.sock] = sub
+                self._selector.register(sub.sock, selectors.EVENT_READ)
+                self._flush(sub)
+
+            frames = b"".join(self._frame(event) for event in outgoing)
+            now = time.monotonic()
+            beat = now >= next_beat
+            if beat:
+                next_beat = now + self.heartbeat
+            for sub in list(self._subs.values()):
+                if sub.closing:
+                    continue
+                if sub.kind == "sse":
+                    sub.buffer += frames
+                    if beat:
+                        sub.buffer += b": ping\n\n"
+                elif last_id > sub.since:
+                    self._poll_response(sub, self.since(sub.since), last_id)
+                elif now >= sub.deadline:
+                    self._poll_response(sub, [], last_id)
+                self._flush(sub)
+
+        for sub in list(self._subs.values()):
+            self._drop(sub)
+
+    def _readable(self, sub):
+        # Subscribers never send after their request: data or EOF means gone
+        try:
+            if sub.sock.recv(4096):
+                return True
+        except BlockingIOError:
+            return True
+        except OSError:
+            pass
+        self._drop(sub)
+        return False
+
+    def _flush(self, sub):
+        if sub.sock not in self._subs:
+            return
+        try:
+            while sub.buffer:
+                sent = sub.sock.send(sub.buffer)
+                del sub.buffer[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(sub)
+            return
+        if len(sub.buffer) > self.max_buffer:
+            self._drop(sub)  # Too slow to keep up
+            return
+        if not sub.buffer and sub.closing:
+            self._drop(sub)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if sub.buffer else 0)
+        if self._selector.get_key(sub.sock).events != events:
+            self._selector.modify(sub.sock, events)
+
+    def _drop(self, sub):
+        self._subs.pop(sub.sock, None)
+        try:
+            self._selector.unregister(sub.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            sub.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sub.sock.close()
+
+
+def stream_events(handler, hub):
+    """GET /api/events: send the SSE headers and hand the socket to the hub."""
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/event-stream")
+    handler.send_header("Cache-Control", "no-cache")
+    handler.send_header("Connection", "close")
+    handler.end_headers()
+    last = handler.headers.get("Last-Event-ID", "")
+    handler.detach()
+    hub.attach_sse(handler.connection, int(last) if last.isdigit() else None)
+
+
+def long_poll(handler, hub, since):
+    """GET /api/events/poll?since=N: answer now if there is news, else park the socket."""
+    since = int(since) if since and since.isdigit() else hub.last_id
+    events = hub.since(since)
+    if events == []:
+        handler.detach()
+        hub.attach_poll(handler.connection, since)
+        return
+    last_id = events[-1]["id"] if events else hub.last_id
+    body = hub.poll_body(events or [], last_id, reset=events is None)
+    handler.send_response(200)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Cache-Control", "no-store")
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
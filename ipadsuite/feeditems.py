@@ -0,0 +1,95 @@
+"""
+Feed item store
+Every entry the refresher fetches is kept on disk in a journaled
+collection, one item per GUID (or link): the id is a hash of it, so
+an entry seen again, in the same feed or another, is not stored twice.
+Items are paged newest first by published date across all feeds,
+carry their read/unread state, and are pruned after ``retention``
+seconds or past ``max_items``.
+"""
+
+import hashlib
+import time
+
+from .store import Collection
+
+RETENTION = 30 * 24 * 3600  # Notizie tenute per 30 giorni
+MAX_ITEMS = 20000
+
+
+def entry_id(entry):
+    """Stable id of a feed entry: a hash of its GUID, else its link, else its title."""
+    key = entry.get("id") or entry.get("link") or entry.get("title") or ""
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def published(entry, now):
+    """Published (or updated) date of ``entry`` as a UTC ISO string, ``now`` if it has none."""
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", parsed or time.gmtime(now))
+
+
+class FeedItems:
+    """Stored feed items: ingest, pages newest first, read state, retention."""
+
+    def __init__(self, retention=RETENTION, max_items=MAX_ITEMS, sync=True):
+        self.retention = retention
+        self.max_items = max_items
+        self.collection = Collection("feed_items", sync=sync, index_by="read", order_by="published")
+
+    def __len__(self):
+        return len(self.collection)
+
+    def open(self, directory):
+        self.collection.open(directory)
+
+    def close(self):
+        self.collection.close()
+
+    def ingest(self, url, source, entries, now=None):
+        """Store the entries of feed ``url`` not seen before; returns how many were new.
+
+        Entries already past the retention are skipped, and so are, once
+        the store is full, entries older than every stored item: a pruned
+        item still listed by its feed does not come back only to be
+        pruned again.
+        """
+        now = time.time() if now is None else now
+        oldest = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - self.retention))
+        floor = None  # Published date of the oldest stored item, when full
+        if len(self.collection) >= self.max_items:
+            _, first, _ = self.collection.page(limit=1)
+            floor = first[0][1]["published"] if first else None
+        ops, seen = [], set()
+        for entry in entries:
+            item_id = entry_id(entry)
+            if item_id in self.collection or item_id in seen:
+                continue
+            date = published(entry, now)
+            if date < oldest or (floor is not None and date <= floor):
+                continue
+            seen.add(item_id)
+            ops.append(("put", {"id": item_id, "item": {
+                "title": entry.get("title", ""),
+                "link": entry.get("link", ""),
+                "source": source,
+                "feed": url,
+                "published": date,
+                "read": False,
+            }}))
+        if ops:
+            self.collection.batch(ops)
+        return len(ops)
+
+    def mark(self, ids, read=True):
+        """Set the read state of ``ids``; returns (rev, records) as ``Collection.batch()``."""
+        return self.collection.batch([("read", {"id": item_id, "read": read}) for item_id in ids])
+
+    def prune(self, now=None):
+        """Delete items past the retention or past the newest ``max_items``; returns how many."""
+        now = time.time() if now is None else now
+        oldest = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - self.retention))
+        ids = self.collection.expired(oldest, self.max_items)
+        if ids:
+            self.collection.batch([("delete", {"id": item_id}) for item_id in ids])
+        return len(ids)
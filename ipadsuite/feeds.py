@@ -0,0 +1,305 @@
+"""
+RSS feed cache
+Feeds are fetched by a background thread on a schedule and kept
+in memory, so /api/rss never waits on the network.
+Due feeds are fetched in parallel, each with its own timeout, and
+with conditional GET so unchanged feeds cost a 304; a feed whose body
+comes back byte for byte the same is not parsed again. With a
+FeedItems store every fetched entry is also kept on disk (see
+feeditems.py); the cache itself holds the latest few per feed.
+
+Each feed has its own interval. A heap orders the feeds by next fetch;
+the interval stretches (up to MAX_FACTOR times) while a feed does not
+change and shrinks back when it does, failures back off exponentially,
+and every delay gets some jitter so feeds do not all fire together;
+start() also spreads the first fetch of each feed over its interval.
+"""
+
+import gzip
+import hashlib
+import heapq
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import feedparser
+
+from . import metrics
+
+FETCH_SECONDS = metrics.histogram("ipad_feed_fetch_seconds", "Time to fetch and parse a feed.", ["feed"])
+FETCHES = metrics.counter("ipad_feed_fetches_total",
+                          "Feed fetches by result (changed, unchanged, not_modified, error).",
+                          ["feed", "result"])
+
+MAX_FACTOR = 8  # Un feed fermo viene scaricato al massimo 8 volte più di rado
+MAX_BACKOFF = 6 * 3600  # Secondi di attesa massima dopo errori ripetuti
+JITTER = 0.1  # +-10% on every delay
+STARTUP_SPREAD = 30  # Seconds over which the first fetches are spread by start()
+USER_AGENT = "ipadsuite/1.0 (+feedparser)"
+
+
+def fetch_feed(url, etag=None, modified=None, timeout=10):
+    """GET ``url`` with conditional headers: (status, body, headers); body is None on a 304."""
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, "Accept-Encoding": "gzip"})
+    if etag:
+        request.add_header("If-None-Match", etag)
+    if modified:
+        request.add_header("If-Modified-Since", modified)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            headers = {k.lower(): v for k, v in response.headers.items()}
+            status = response.status
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, None, {}
+        raise
+    if headers.get("content-encoding") == "gzip":
+        body = gzip.decompress(body)
+        del headers["content-encoding"]
+    headers.setdefault("content-location", url)
+    return status, body, headers
+
+
+class FeedCache:
+    """Parsed feeds kept in memory, each refreshed on its own schedule.
+
+    ``feeds`` is a list of URLs or ``(url, ttl)`` tuples; plain URLs use
+    the default ``ttl`` (seconds), the shortest interval the feed is
+    fetched at. New entries also go to ``items``, a FeedItems store,
+    when given.
+    """
+
+    def __init__(self, feeds, ttl=300, per_feed=3, timeout=10, workers=8, items=None):
+        self.ttl = ttl
+        self.items = items
+        self.per_feed = per_feed
+        self.timeout = timeout
+        self.workers = workers
+        self.parses = 0
+        self._state = {}  # url -> {"entries", "source", "fetched_at", "error", ...}
+        self._schedule = {}  # url -> {"interval", "delay", "failures", "next"}
+        self._heap = []  # (next fetch, url); stale entries are skipped
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()  # A feed was added: recompute the wait
+        self._thread = None
+        self.listeners = []  # Called after a refresh that brought new entries
+        for feed in feeds:
+            url, feed_ttl = feed if isinstance(feed, tuple) else (feed, ttl)
+            self.add(url, feed_ttl)
+
+    @property
+    def urls(self):
+        with self._lock:
+            return list(self._schedule)
+
+    def add(self, url, interval=None):
+        """Start refreshing ``url`` every ``interval`` seconds (or change its interval)."""
+        interval = self.ttl if interval is None else interval
+        with self._lock:
+            sched = self._schedule.get(url)
+            if sched is not None:
+                sched["interval"] = sched["delay"] = interval
+                return
+            self._schedule[url] = {"interval": interval, "delay": interval, "failures": 0, "next": None}
+            self._push(url, time.time())  # Subito la prima volta
+        self._wakeup.set()
+
+    def remove(self, url):
+        """Stop refreshing ``url`` and drop its cached entries."""
+        with self._lock:
+            self._schedule.pop(url, None)  # Its heap entry goes stale
+            self._state.pop(url, None)
+
+    def _push(self, url, when):
+        self._schedule[url]["next"] = when
+        heapq.heappush(self._heap, (when, url))
+
+    def _take_due(self, now):
+        """Pop the feeds due at ``now``; they are off the heap until rescheduled."""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, url = heapq.heappop(self._heap)
+                sched = self._schedule.get(url)
+                if sched is not None and sched["next"] == when:
+                    sched["next"] = None
+                    due.append(url)
+        return due
+
+    def _reschedule(self, url, result, now):
+        with self._lock:
+            sched = self._schedule.get(url)
+            if sched is None:
+                return  # Removed while it was being fetched
+            interval = sched["interval"]
+            if result == "error":
+                sched["failures"] += 1
+                sched["delay"] = min(interval * 2 ** min(sched["failures"], 16), max(MAX_BACKOFF, interval))
+            else:
+                sched["failures"] = 0
+                if result == "changed":
+                    sched["delay"] = max(interval, sched["delay"] / 2)
+                else:
+                    sched["delay"] = min(interval * MAX_FACTOR, max(interval, sched["delay"] * 1.5))
+            self._push(url, now + sched["delay"] * random.uniform(1 - JITTER, 1 + JITTER))
+
+    def refresh(self, url):
+        """Fetch and parse a single feed, keeping the old entries on error.
+
+        Returns True if the cached entries changed, and schedules the
+        next fetch of the feed by how this one went.
+        """
+        with self._lock:
+            state = self._state.get(url) or {}
+            etag, modified, digest = state.get("etag"), state.get("modified"), state.get("digest")
+        started = time.perf_counter()
+        try:
+            status, body, headers = fetch_feed(url, etag=etag, modified=modified, timeout=self.timeout)
+            if status == 304 or hashlib.sha1(body).digest() == digest:
+                # Nothing new: no parsing
+                result = "not_modified" if status == 304 else "unchanged"
+                with self._lock:
+                    if url in self._state:
+                        self._state[url].update(fetched_at=time.time(), error=None)
+                        if status != 304:
+                            self._state[url].update(etag=headers.get("etag"), modified=headers.get("last-modified"))
+                FETCH_SECONDS.labels(url).observe(time.perf_counter() - started)
+            else:
+                feed = feedparser.parse(body, response_headers=headers)
+                FETCH_SECONDS.labels(url).observe(time.perf_counter() - started)
+                if feed.bozo and not feed.entries:
+                    raise ValueError(str(feed.get("bozo_exception", "parse error")))
+                entries = [{
+                    "title": entry.get("title", ""),
+                    "link": entry.get("link", ""),
+                    "source": feed.feed.get("title", ""),
+                } for entry in feed.entries[:self.per_feed]]
+                if self.items is not None:
+                    new = self.items.ingest(url, feed.feed.get("title", ""), feed.entries)
+                else:
+                    new = 0
+                with self._lock:
+                    self.parses += 1
+                    changed = self._state.get(url, {}).get("entries") != entries or new > 0
+                    if url in self._schedule:
+                        self._state[url] = {
+                            "entries": entries,
+                            "source": feed.feed.get("title", ""),
+                            "fetched_at": time.time(),
+                            "error": None,
+                            "etag": headers.get("etag"),
+                            "modified": headers.get("last-modified"),
+                            "digest": hashlib.sha1(body).digest(),
+                        }
+                result = "changed" if changed else "unchanged"
+        except Exception as e:
+            result = "error"
+            with self._lock:
+                if url in self._schedule:
+                    state = self._state.setdefault(url, {
+                        "entries": [], "source": "", "fetched_at": None,
+                    })
+                    state["error"] = str(e)
+                    state["failed_at"] = time.time()
+        FETCHES.labels(url, result).inc()
+        self._reschedule(url, result, time.time())
+        return result == "changed"
+
+    def refresh_due(self):
+        """Refresh every due feed concurrently; a failing feed only affects itself."""
+        urls = self._take_due(time.time())
+        if len(urls) <= 1:
+            changed = [self.refresh(url) for url in urls]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(urls))) as pool:
+                changed = list(pool.map(self.refresh, urls))
+        if self.items is not None:
+            self.items.prune()
+        if any(changed):
+            for listener in self.listeners:
+                listener()
+
+    def next_due_in(self, now=None):
+        """Seconds until the next feed is due (0 if one already is)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._heap:
+                when, url = self._heap[0]
+                sched = self._schedule.get(url)
+                if sched is not None and sched["next"] == when:
+                    return max(0.0, when - now)
+                heapq.heappop(self._heap)  # Removed or rescheduled
+        return self.ttl
+
+    def start(self):
+        """Start the background refresher (idempotent)."""
+        if self._thread is not None:
+            return
+        now = time.time()
+        with self._lock:
+            for url, sched in self._schedule.items():
+                if sched["next"] is not None and sched["next"] <= now:
+                    self._push(url, now + random.uniform(0, min(sched["interval"], STARTUP_SPREAD)))
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="feed-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh_due()
+            self._wakeup.wait(self.next_due_in())
+            self._wakeup.clear()
+
+    def status(self, url, now=None):
+        """Schedule of ``url``: interval, current delay, failures, seconds to the next fetch."""
+        now = time.time() if now is None else now
+        with self._lock:
+            sched = self._schedule.get(url)
+            if sched is None:
+                return None
+            state = self._state.get(url) or {}
+            return {
+                "interval": sched["interval"],
+                "delay": round(sched["delay"], 1),
+                "failures": sched["failures"],
+                "next_in": round(max(0.0, sched["next"] - now), 1) if sched["next"] is not None else 0.0,
+                "title": state.get("source", ""),
+                "error": state.get("error"),
+            }
+
+    def snapshot(self, now=None):
+        """Payload for /api/rss: cached entries plus per-feed freshness."""
+        now = time.time() if now is None else now
+        feeds, sources = [], []
+        with self._lock:
+            for url, sched in self._schedule.items():
+                state = self._state.get(url)
+                if state is None:
+                    sources.append({"url": url, "fetched_at": None, "age": None,
+                                    "stale": True, "error": None})
+                    continue
+                fetched_at = state["fetched_at"]
+                age = now - fetched_at if fetched_at else None
+                feeds.extend(state["entries"])
+                sources.append({
+                    "url": url,
+                    "title": state["source"],
+                    "fetched_at": datetime.fromtimestamp(fetched_at).isoformat() if fetched_at else None,
+                    "age": round(age, 1) if age is not None else None,
+                    "stale": age is None or age > sched["delay"],
+                    "error": state["error"],
+                })
+        return {"feeds": feeds, "sources": sources}
@@ -0,0 +1,224 @@
+"""
+Metrics
+Counters, gauges and histograms kept in memory and rendered at
+/metrics in the Prometheus text format. Recording is a dict lookup
+and a locked increment; values that already exist elsewhere (cache
+hits, subscriber counts) are read by callbacks at scrape time only,
+and per-request data is buffered by the server and folded in by a
+background thread (see serving.py).
+"""
+
+import bisect
+import threading
+
+# Seconds: from a cached JSON body to a slow feed
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1, 2.5, 5, 10)
+# Bytes: from an empty 304 to a large upload
+SIZE_BUCKETS = (0, 256, 1024, 4096, 16384, 65536, 262144, 1048576,
+                4194304, 16777216, 67108864)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last one is +Inf
+        self.sum = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Metric:
+    """A metric family; ``labels(...)`` returns the child for one label set."""
+
+    def __init__(self, kind, name, help, labelnames=(), buckets=None):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if buckets else None
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        if self.kind == "counter":
+            return _CounterValue()
+        if self.kind == "gauge":
+            return _GaugeValue()
+        return _HistogramValue(self.buckets)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    # Metrics without labels are used directly
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}")
+                continue
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+class Callback:
+    """A metric read at scrape time: ``fn()`` yields ``(label values, value)`` pairs."""
+
+    def __init__(self, kind, name, help, labelnames, fn):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in self.fn():
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(value)}")
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = {}
+        self.before_render = []  # Called first on every scrape (e.g. to fold buffered data)
+
+    def _add(self, metric):
+        # Modules may be loaded twice (the scripts in the benchmarks): reuse the family
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Metric("counter", name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Metric("gauge", name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Metric("histogram", name, help, labelnames, buckets))
+
+    def callback(self, kind, name, help, labelnames, fn):
+        """Register (or replace) a metric computed by ``fn`` at scrape time."""
+        self._metrics[name] = Callback(kind, name, help, labelnames, fn)
+
+    def render(self):
+        for hook in list(self.before_render):
+            hook()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+callback = REGISTRY.callback
+
+# Shared by blobs and the SMB share, told apart by ``kind``
+SEND_SECONDS = histogram("ipad_file_send_seconds", "Time spent in sendfile() per response.", ["kind"])
+
+
+def cache_metrics(caches):
+    """Hit/miss counters and hit ratio for objects with ``hits`` and ``misses``.
+
+    ``caches`` maps a cache name to the object.
+    """
+    def totals(attr):
+        return lambda: [((name,), getattr(c, attr)) for name, c in caches.items()]
+
+    def ratios():
+        for name, c in caches.items():
+            total = c.hits + c.misses
+            yield (name,), round(c.hits / total, 4) if total else 0
+
+    callback("counter", "ipad_cache_hits_total", "Cache hits.", ["cache"], totals("hits"))
+    callback("counter", "ipad_cache_misses_total", "Cache misses.", ["cache"], totals("misses"))
+    callback("gauge", "ipad_cache_hit_ratio", "Cache hits / lookups since start.", ["cache"], ratios)
+
+
+def send_metrics(handler, registry=REGISTRY):
+    """GET /metrics."""
+    body = registry.render().encode()
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+    handler.send_header("Content-Length", str(len(body)))
+    handler.send_header("Cache-Control", "no-store")
+    handler.end_headers()
+    handler.wfile.write(body)
@@ -0,0 +1,5 @@
+"""
+App modules
+Each one has ``setup(app, **options)``, which adds its storage, routes
+and page tab to the app. Only todos is always loaded.
+"""
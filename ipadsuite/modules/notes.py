@@ -0,0 +1,226 @@
+"""
+Notes
+Notes with an optional image and comments. Images are uploaded raw to
+POST /api/blobs (or sent inline as a data: URL, decoded while reading)
+and stored by hash, with thumbnails made in the background.
+POST /api/notes/batch {"ops": [...]} adds, comments on and deletes
+many notes at once (images by hash only).
+"""
+
+from datetime import datetime
+
+from ..blobs import BlobStore, send_blob, send_file
+from ..bodies import read_json
+from ..search import note_text
+from ..thumbs import Thumbnailer
+
+MAX_UPLOAD = 25 * 1024 * 1024
+
+CSS = '''
+.note-item{padding:10px;border-bottom:1px solid #eee;display:flex;flex-direction:column;align-items:start}
+.note-img{max-width:100%;max-height:200px;border-radius:5px;margin-top:10px}
+.comment{background:#f9f9f9;padding:8px;border-radius:5px;margin-top:8px;font-size:12px}
+'''
+
+JS = '''
+function previewImage(){
+  const file=document.getElementById('noteImage').files[0];
+  if(!file)return;
+  const preview=document.getElementById('preview');
+  if(preview.src)URL.revokeObjectURL(preview.src);
+  preview.src=URL.createObjectURL(file);
+  preview.classList.remove('hidden');
+}
+
+function imageUrl(image,width){
+  if(image.startsWith('data:'))return image;
+  return width?`/blobs/${image}?w=${width}`:`/blobs/${image}`;
+}
+
+async function addNote(){
+  const text=document.getElementById('noteText').value;
+  const file=document.getElementById('noteImage').files[0];
+  if(!text.trim())return;
+  let image=null;
+  if(file){
+    // L'immagine viaggia come file binario, la nota tiene solo l'hash
+    const r=await fetch('/api/blobs',{method:'POST',headers:{'Content-Type':file.type||'application/octet-stream'},body:file});
+    image=(await r.json()).hash;
+  }
+  await noteAction('/api/notes',{text,image});
+  document.getElementById('noteText').value='';
+  document.getElementById('noteImage').value='';
+  document.getElementById('preview').classList.add('hidden');
+}
+
+async function noteAction(url,body){
+  const d=await post(url,body);
+  apply('notes',d.id,d.note);
+  renderNotes();
+  loadNotes();
+}
+
+async function addComment(id){
+  const text=prompt('Comment:');
+  if(!text)return;
+  await noteAction('/api/notes/comment',{id,text});
+}
+
+async function deleteNote(id){
+  await noteAction('/api/notes/delete',{id});
+}
+
+async function loadNotes(){
+  await sync('notes');
+  renderNotes();
+}
+
+function renderNotes(){
+  const notes=state.notes;
+  const list=document.getElementById('notesList');
+  if(!Object.keys(notes).length){list.innerHTML='<p style="text-align:center;color:#999">No notes</p>';return}
+  list.innerHTML=Object.entries(notes).map(([id,n])=>`
+    <div class="note-item">
+      <strong>${n.text}</strong>
+      ${n.image?`<a href="${imageUrl(n.image)}" target="_blank"><img src="${imageUrl(n.image,320)}" class="note-img"></a>`:''}
+      <small style="color:#999;margin-top:5px">${new Date(n.created).toLocaleString()}</small>
+      <div style="margin-top:10px">
+        ${n.comments.map(c=>`<div class="comment">${c.text} <small>${new Date(c.time).toLocaleTimeString()}</small></div>`).join('')}
+        <button onclick="addComment('${id}')" style="font-size:12px;padding:5px 10px;margin-top:5px">💬 Comment</button>
+      </div>
+      <button onclick="deleteNote('${id}')" style="background:#f44336;margin-top:10px;font-size:12px">Delete</button>
+    </div>
+  `).join('');
+}
+
+loaders.notes=loadNotes;
+'''
+
+HTML = '''
+<div class="card">
+<h2>Create Note</h2>
+<textarea id="noteText" placeholder="Testo"></textarea>
+<input type="file" id="noteImage" accept="image/*" onchange="previewImage()">
+<img id="preview" style="max-width:100%;margin:10px 0" class="hidden">
+<button onclick="addNote()">+ Save Note</button>
+<div id="notesList"></div>
+</div>
+'''
+
+
+def setup(app, max_upload=MAX_UPLOAD):
+    notes, _ = app.collection("notes", "note", note_text)
+    blobs = BlobStore(app.data_dir / "blobs")  # Immagini delle note
+    thumbnailer = Thumbnailer(blobs)  # Miniature 320/1024px per la lista note
+    app.notes, app.blobs, app.thumbnailer = notes, blobs, thumbnailer
+    app.on_stop.append(thumbnailer.close)
+
+    def respond(req, note_id, rev):
+        req.send_json({"id": note_id, "note": notes.item(note_id), "rev": rev})
+
+    # Base64 makes an inline image 4/3 bigger, plus room for the text
+    @app.route("POST", "/api/notes", body_limit=max_upload * 4 // 3 + 64 * 1024)
+    def add(req, query):
+        # Inline images in a note are decoded to the blob store while reading
+        data = read_json(req.body(), blobs)
+        if not isinstance(data, dict):
+            req.send_error(400, "body must be a JSON object")
+            return
+        if not isinstance(data.get("text", ""), str):
+            req.send_error(400, "text must be a string")
+            return
+        image = data.get("image")
+        if image is not None and not isinstance(image, str):
+            req.send_error(400, "image must be a blob hash")
+            return
+        if image and not blobs.exists(image):
+            image = None
+        elif image:
+            thumbnailer.submit(image)  # Già fatte per /api/blobs; servono per le immagini inline
+        note_id, rev = notes.add({
+            "text": data.get("text", ""),
+            "image": image,
+            "created": datetime.now().isoformat(),
+            "comments": [],
+        })
+        respond(req, note_id, rev)
+
+    @app.route("POST", "/api/notes/{action}")
+    def change(req, query, action):
+        data = read_json(req.body())
+        if not isinstance(data, dict):
+            req.send_error(400, "body must be a JSON object")
+            return
+        note_id = data.get("id")
+        if not isinstance(data.get("text", ""), str):
+            req.send_error(400, "text must be a string")
+            return
+        if action not in ("comment", "delete"):
+            req.send_error(404)
+            return
+        if not isinstance(note_id, str):
+            req.send_error(400, "id must be a string")
+            return
+        if action == "comment":
+            rev = notes.commit("comment", id=note_id, comment={
+                "text": data.get("text", ""),
+                "time": datetime.now().isoformat(),
+            })
+        else:
+            rev = notes.commit("delete", id=note_id)
+        # None: the note does not exist (any more), nothing changed
+        respond(req, note_id, notes.seq if rev is None else rev)
+
+    def prepare(op):
+        action, note_id = op.get("op"), op.get("id")
+        if not isinstance(op.get("text", ""), str):
+            raise ValueError("text must be a string")
+        if action == "add":
+            image = op.get("image")
+            if not isinstance(image, str) or not blobs.exists(image):
+                image = None
+            return "add", {"item": {
+                "text": op.get("text", ""),
+                "image": image,
+                "created": datetime.now().isoformat(),
+                "comments": [],
+            }}
+        if not isinstance(note_id, str):
+            raise ValueError("id missing")
+        if action == "comment":
+            return "comment", {"id": note_id, "comment": {
+                "text": op.get("text", ""),
+                "time": datetime.now().isoformat(),
+            }}
+        if action == "delete":
+            return "delete", {"id": note_id}
+        raise ValueError(f"not a note operation: {action}")
+
+    app.batch_route("notes", notes, prepare)
+
+    @app.route("POST", "/api/blobs", body_limit=max_upload)
+    def upload(req, query):
+        # Raw image body, streamed to disk; the note then refers to it by hash
+        if req.headers.get("Content-Length", "0") == "0" and "chunked" not in req.headers.get("Transfer-Encoding", ""):
+            req.send_error(411)
+            return
+        digest = blobs.put_stream(req.body())
+        thumbnailer.submit(digest)  # In background, la risposta non aspetta
+        req.send_json({"hash": digest, "url": f"/blobs/{digest}"})
+
+    # HEAD too: video players probe files before seeking
+    @app.route(("GET", "HEAD"), "/blobs/{digest}")
+    def get_blob(req, query, digest):
+        # ?w=320 serves the smallest thumbnail at least that wide
+        width = query.get("w", [""])[0]
+        if width.isdigit() and blobs.exists(digest):
+            path, size = thumbnailer.path(digest, int(width))
+            if size:
+                send_file(req, path, f'"{digest}.{size}"', "image/jpeg")
+                return
+            # Not made yet: the original for now, revalidated so the thumbnail replaces it
+            send_blob(req, blobs, digest, immutable=not thumbnailer.available)
+            return
+        send_blob(req, blobs, digest)
+
+    app.add_tab("notes", "📝 Notes", HTML, CSS, JS)
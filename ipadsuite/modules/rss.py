@@ -0,0 +1,234 @@
+"""
+RSS feeds
+GET /api/rss serves the feeds cached in memory by a background
+refresher; every entry fetched is also stored on disk, and
+GET /api/rss?limit=30&cursor=...&read=false pages through them newest
+first across all feeds. POST /api/rss/read {ids, read} marks them.
+
+The feeds subscribed to are kept on disk too: GET /api/feeds lists
+them with their schedule, POST /api/feeds {url, interval} adds one and
+POST /api/feeds/delete {id} removes it. ``feeds`` only seeds the list
+on the first start. Importing this module is what loads feedparser.
+"""
+
+import math
+import threading
+from datetime import datetime
+
+from ..app import CORS, MAX_BATCH
+from ..bodies import read_json
+from ..feeditems import MAX_ITEMS, RETENTION, FeedItems
+from ..feeds import FeedCache
+from ..payloads import send_page
+from ..search import index_feeds
+from ..store import Collection
+
+RSS_FEEDS = [
+    "https://news.ycombinator.com/rss",
+    "https://feeds.arstechnica.com/arstechnica/index",
+]
+RSS_TTL = 300  # Secondi prima di riscaricare un feed
+MIN_INTERVAL = 60  # Intervallo minimo per i feed aggiunti da /api/feeds
+
+CSS = '''
+.feed-item{padding:12px;border-left:4px solid #007AFF;margin-bottom:12px;font-size:13px}
+.feed-item strong{display:block;margin-bottom:4px}
+.feed-item small{color:#757575;display:block}
+.feed-item a{color:#007AFF;text-decoration:none}
+.feed-item.read{border-left-color:#ccc;opacity:0.6}
+.feed-source{display:flex;justify-content:space-between;font-size:12px;padding:4px 0;color:#757575}
+.feed-source button{padding:2px 8px;font-size:12px}
+'''
+
+JS = '''
+const feeds={items:[],next:null};
+
+async function loadFeeds(more){
+  const list=document.getElementById('feedList');
+  try{
+    const r=await fetch(more&&feeds.next?`/api/rss?limit=30&cursor=${feeds.next}`:'/api/rss?limit=30');
+    const d=await r.json();
+    if(!d.items.length&&!more){
+      // Niente in archivio: il server sta ancora scaricando i feed, o non ci riesce
+      const s=await (await fetch('/api/rss')).json();
+      if(s.error){list.innerHTML=`<p style="color:#f44336">Errore: ${s.error}</p>`;return}
+      setTimeout(loadFeeds,3000);return;
+    }
+    feeds.items=more?feeds.items.concat(d.items):d.items;
+    feeds.next=d.next;
+    renderFeeds();
+  }catch(e){list.innerHTML='<p style="color:#f44336">Errore caricamento feed</p>'}
+}
+
+function renderFeeds(){
+  document.getElementById('feedList').innerHTML=feeds.items.map(f=>`
+    <div class="feed-item ${f.read?'read':''}">
+      <strong>${f.title}</strong>
+      <small>${f.source} · ${new Date(f.published).toLocaleString()}</small>
+      <a href="${f.link}" target="_blank" onclick="markRead(['${f.id}'])">Leggi →</a>
+    </div>
+  `).join('');
+  document.getElementById('feedMore').classList.toggle('hidden',!feeds.next);
+}
+
+async function markRead(ids){
+  feeds.items.forEach(f=>{if(ids.includes(f.id))f.read=true});
+  renderFeeds();
+  await post('/api/rss/read',{ids,read:true});
+}
+
+function markAllRead(){
+  const ids=feeds.items.filter(f=>!f.read).map(f=>f.id);
+  if(ids.length)markRead(ids);
+}
+
+async function loadFeedList(){
+  const d=await (await fetch('/api/feeds')).json();
+  document.getElementById('feedSources').innerHTML=d.feeds.map(f=>`
+    <div class="feed-source">
+      <span>${f.title||f.url}${f.error?' ⚠️':''}</span>
+      <button onclick="removeFeed('${f.id}')">✕</button>
+    </div>
+  `).join('');
+}
+
+async function addFeed(){
+  const input=document.getElementById('feedUrl');
+  if(!input.value.trim())return;
+  await post('/api/feeds',{url:input.value.trim()});
+  input.value='';
+  loadFeedList();
+}
+
+async function removeFeed(id){
+  await post('/api/feeds/delete',{id});
+  loadFeedList();
+  loadFeeds();
+}
+
+async function loadRss(){
+  loadFeedList();
+  await loadFeeds();
+}
+
+loaders.feeds=loadRss;
+'''
+
+HTML = '''
+<div class="card">
+<h2>RSS Feeds</h2>
+<button onclick="markAllRead()" style="background:#999">Mark all read</button>
+<div id="feedList">Caricamento...</div>
+<button id="feedMore" class="hidden" onclick="loadFeeds(true)">More</button>
+</div>
+<div class="card">
+<h2>Feeds</h2>
+<input id="feedUrl" placeholder="https://...">
+<button onclick="addFeed()">+ Add</button>
+<div id="feedSources"></div>
+</div>
+'''
+
+
+def setup(app, feeds=RSS_FEEDS, ttl=RSS_TTL, retention=RETENTION, max_items=MAX_ITEMS):
+    items = FeedItems(retention, max_items)  # Archivio di tutte le notizie scaricate
+    feed_cache = FeedCache(feeds, ttl=ttl, items=items)
+    registry = Collection("feeds")  # Feed sottoscritti: {url, interval, created}
+    registry_lock = threading.Lock()  # One feed per URL, even with concurrent POSTs
+    app.feed_cache, app.feed_items, app.feed_registry = feed_cache, items, registry
+    feed_cache.listeners.append(lambda: app.hub.publish("feeds"))
+    feed_cache.listeners.append(lambda: index_feeds(app.search_index, feed_cache))
+
+    def open_registry():
+        registry.open(app.data_dir)
+        if not registry.seq:
+            # First start: subscribe to the feeds given to setup()
+            registry.batch([("add", {"item": {
+                "url": url, "interval": feed_cache.status(url)["interval"],
+                "created": datetime.now().isoformat(),
+            }}) for url in feed_cache.urls])
+            return
+        subscribed = {feed["url"]: feed["interval"] for feed in registry.copy().values()}
+        for url in feed_cache.urls:
+            if url not in subscribed:
+                feed_cache.remove(url)
+        for url, interval in subscribed.items():
+            feed_cache.add(url, interval)
+
+    app.on_start.append(lambda: items.open(app.data_dir))
+    app.on_start.append(open_registry)
+    app.on_start.append(feed_cache.start)
+    app.on_stop.append(items.close)
+    app.on_stop.append(registry.close)
+    app.on_stop.append(lambda: feed_cache.stop(timeout=1))
+
+    def describe(feed_id, feed):
+        return {"id": feed_id, "url": feed["url"], **(feed_cache.status(feed["url"]) or {}),
+                "interval": feed["interval"]}
+
+    @app.route("GET", "/api/feeds")
+    def list_feeds(req, query):
+        rev, feeds = registry.state()
+        req.send_json({"rev": rev, "feeds": [describe(feed_id, feed) for feed_id, feed in feeds.items()]})
+
+    @app.route("POST", "/api/feeds")
+    def add_feed(req, query):
+        data = read_json(req.body())
+        url = data.get("url") if isinstance(data, dict) else None
+        interval = data.get("interval", ttl) if isinstance(data, dict) else None
+        if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+            req.send_error(400, "url must be an http(s) URL")
+            return
+        if (not isinstance(interval, (int, float)) or isinstance(interval, bool)
+                or not math.isfinite(interval) or interval < MIN_INTERVAL):
+            req.send_error(400, f"interval must be a number of at least {MIN_INTERVAL} seconds")
+            return
+        with registry_lock:
+            found = [(feed_id, feed) for feed_id, feed in registry.state()[1].items() if feed["url"] == url]
+            if found:
+                feed_id, feed = found[0]  # Already subscribed
+            else:
+                feed = {"url": url, "interval": interval, "created": datetime.now().isoformat()}
+                feed_id, _ = registry.add(feed)
+                feed_cache.add(url, interval)
+        app.hub.publish("feeds")
+        req.send_json({"id": feed_id, "feed": describe(feed_id, feed)})
+
+    @app.route("POST", "/api/feeds/delete")
+    def remove_feed(req, query):
+        data = read_json(req.body())
+        feed_id = data.get("id") if isinstance(data, dict) else None
+        with registry_lock:
+            feed = registry.get(feed_id) if isinstance(feed_id, str) else None
+            if feed is not None:
+                registry.commit("delete", id=feed_id)
+                feed_cache.remove(feed["url"])
+        if feed is not None:
+            app.hub.publish("feeds")
+        req.send_json({"id": feed_id, "feed": None, "rev": registry.seq})
+
+    @app.route("GET", "/api/rss")
+    def get_rss(req, query):
+        if "limit" in query or "cursor" in query or "read" in query:
+            send_page(req, items.collection, query, CORS, newest_first=True)
+            return
+        # Served from the cache, the refresher thread does the fetching
+        data = feed_cache.snapshot()
+        if not data["feeds"]:
+            errors = [s["error"] for s in data["sources"] if s["error"]]
+            if errors:
+                data["error"] = "; ".join(errors)
+        req.send_json(data)
+
+    @app.route("POST", "/api/rss/read", body_limit=MAX_BATCH * 64)
+    def mark_read(req, query):
+        data = read_json(req.body())
+        ids = data.get("ids") if isinstance(data, dict) else None
+        if (not isinstance(ids, list) or len(ids) > MAX_BATCH
+                or not all(isinstance(item_id, str) for item_id in ids)):
+            req.send_error(400, f"ids must be a list of at most {MAX_BATCH} ids")
+            return
+        rev, records = items.mark(ids, bool(data.get("read", True)))
+        req.send_json({"rev": rev, "ids": [rec and rec["id"] for rec in records]})
+
+    app.add_tab("feeds", "📰 RSS", HTML, CSS, JS)
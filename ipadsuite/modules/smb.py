@@ -0,0 +1,102 @@
+"""
+SMB share browser
+Pages through a mounted share (GET /api/smb) and streams its files
+with Range support (GET /api/smb/file?path=...).
+"""
+
+import os
+
+from ..smb import ShareBrowser, send_share_file
+
+SMB_SHARE = os.environ.get("IPAD_SMB_SHARE", "/mnt/smb")  # Cambia con il tuo path SMB
+
+CSS = '''
+.file-item{padding:10px;border:1px solid #ddd;border-radius:5px;margin-bottom:5px;display:flex;justify-content:space-between}
+'''
+
+JS = '''
+let smbPath='';
+let smbOffset=0;
+
+async function browseSMB(path,more){
+  if(path!==undefined)smbPath=path;
+  smbOffset=more?smbOffset:0;
+  const sort=document.getElementById('smbSort').value;
+  const order=sort==='name'?'asc':'desc';
+  const r=await fetch(`/api/smb?path=${encodeURIComponent(smbPath)}&offset=${smbOffset}&limit=200&sort=${sort}&order=${order}`);
+  const list=document.getElementById('fileList');
+  if(!r.ok){list.innerHTML=`<p style="color:red">Errore ${r.status}</p>`;return}
+  const d=await r.json();
+  if(d.error){list.innerHTML=`<p style="color:red">${d.error}</p>`;return}
+  document.getElementById('smbPath').textContent='/'+d.path;
+  const rows=d.files.map(f=>{
+    const rel=encodeURIComponent(d.path?d.path+'/'+f.name:f.name);
+    return `
+    <div class="file-item" ${f.is_dir?`data-dir="${rel}"`:''}>
+      ${f.is_dir?`<span>📁 ${f.name}</span>`:`<a href="/api/smb/file?path=${rel}" target="_blank">📄 ${f.name}</a>`}
+      ${!f.is_dir?`<small>${(f.size/1024).toFixed(1)}KB</small>`:''}
+    </div>
+  `}).join('');
+  const up=d.parent!==null&&!more?`<div class="file-item" data-dir="${encodeURIComponent(d.parent)}"><span>⬆️ ..</span></div>`:'';
+  const old=more?list.querySelector('.more'):null;
+  if(old)old.remove();
+  list.innerHTML=(more?list.innerHTML:up)+rows;
+  smbOffset=d.offset+d.files.length;
+  if(smbOffset<d.total)list.innerHTML+=`<button class="more" onclick="browseSMB(undefined,true)">Altri (${d.total-smbOffset})</button>`;
+}
+
+document.getElementById('fileList').onclick=e=>{
+  const item=e.target.closest('[data-dir]');
+  if(item)browseSMB(decodeURIComponent(item.dataset.dir));
+};
+
+browseSMB();
+'''
+
+HTML = '''
+<div class="card">
+<h2>SMB Share Browser</h2>
+<p style="font-size:12px;color:#666;margin-bottom:10px">Path: <span id="smbPath">/</span></p>
+<button onclick="browseSMB()">🔄 Refresh</button>
+<select id="smbSort" onchange="browseSMB()"><option value="name">Nome</option><option value="size">Dimensione</option><option value="mtime">Data</option></select>
+<div id="fileList"></div>
+</div>
+'''
+
+
+def setup(app, share=SMB_SHARE):
+    browser = ShareBrowser(share)
+    app.share = browser
+    app.caches["smb_listing"] = browser
+
+    @app.route("GET", "/api/smb")
+    def browse(req, query):
+        # ?path=sub/dir&offset=0&limit=200&sort=name|size|mtime&order=asc|desc
+        try:
+            offset = max(int(query.get("offset", ["0"])[0]), 0)
+            limit = min(max(int(query.get("limit", ["200"])[0]), 1), 1000)
+        except ValueError:
+            req.send_error(400, "offset and limit must be integers")
+            return
+        if not os.path.exists(share):
+            req.send_json({"error": "SMB share not found. Mount it first!", "path": share})
+            return
+        try:
+            page = browser.page(
+                query.get("path", [""])[0], offset, limit,
+                query.get("sort", ["name"])[0], query.get("order", ["asc"])[0],
+            )
+        except OSError:  # Share unmounted or unreadable while listing
+            req.send_error(503, "SMB share not readable")
+            return
+        req.send_json(page)
+
+    @app.route(("GET", "HEAD"), "/api/smb/file")
+    def get_file(req, query):
+        target = browser.resolve(query.get("path", [""])[0]) if os.path.exists(share) else None
+        if target is None or not os.path.isfile(target):
+            req.send_error(404)
+            return
+        send_share_file(req, target)
+
+    app.add_tab("smb", "📁 SMB", HTML, CSS, JS)
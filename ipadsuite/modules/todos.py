@@ -0,0 +1,172 @@
+"""
+Todo list
+GET /api/todos (?done=false&limit=50&cursor=... for a page, oldest
+first), POST /api/todos {text} and POST /api/todos/<action> {id, ...}.
+POST /api/todos/batch {"ops": [{"op": "add", "text"}, {"op": "toggle"
+| "edit" | "delete", "id", ...}]} applies many at once. The URLs of the
+old RSS server (/api/todos/add and the id in the path) still work.
+"""
+
+from datetime import datetime
+
+from ..bodies import read_json
+from ..search import todo_text
+
+CSS = '''
+.todo-item{padding:10px;border-bottom:1px solid #eee;display:flex;justify-content:space-between;align-items:start}
+.todo-item.done{opacity:0.5;text-decoration:line-through}
+.todo-text{flex:1}
+.todo-actions{display:flex;gap:5px}
+.todo-actions button{padding:5px 10px;font-size:12px}
+'''
+
+JS = '''
+async function todoAction(url,body){
+  const d=await post(url,body);
+  apply('todos',d.id,d.todo);
+  renderTodos();
+  loadTodos();
+}
+
+async function addTodo(){
+  const input=document.getElementById('todoInput');
+  if(!input.value.trim())return;
+  const text=input.value;
+  input.value='';
+  await todoAction('/api/todos',{text});
+}
+
+async function toggleTodo(id){
+  await todoAction('/api/todos/toggle',{id});
+}
+
+async function editTodo(id){
+  const newText=prompt('Edit:');
+  if(!newText)return;
+  await todoAction('/api/todos/edit',{id,text:newText});
+}
+
+async function deleteTodo(id){
+  await todoAction('/api/todos/delete',{id});
+}
+
+async function clearDone(){
+  const ops=Object.entries(state.todos).filter(([id,t])=>t.done).map(([id])=>({op:'delete',id}));
+  if(!ops.length)return;
+  // Una sola richiesta, poi solo le differenze
+  await post('/api/todos/batch',{ops});
+  loadTodos();
+}
+
+async function loadTodos(){
+  await sync('todos');
+  renderTodos();
+}
+
+function renderTodos(){
+  const todos=state.todos;
+  const list=document.getElementById('todoList');
+  if(!Object.keys(todos).length){list.innerHTML='<p style="text-align:center;color:#999">Nessun task</p>';return}
+  list.innerHTML=Object.entries(todos).map(([id,t])=>`
+    <div class="todo-item ${t.done?'done':''}">
+      <div class="todo-text">
+        <input type="checkbox" ${t.done?'checked':''} onchange="toggleTodo('${id}')"> ${t.text}
+      </div>
+      <div class="todo-actions">
+        <button onclick="editTodo('${id}')">✏️</button>
+        <button onclick="deleteTodo('${id}')">✕</button>
+      </div>
+    </div>
+  `).join('');
+}
+
+loaders.todos=loadTodos;
+'''
+
+HTML = '''
+<div class="card">
+<h2>Todo List</h2>
+<input id="todoInput" placeholder="Nuovo task">
+<button onclick="addTodo()">+ Add</button>
+<button onclick="clearDone()" style="background:#999">Clear done</button>
+<div id="todoList"></div>
+</div>
+'''
+
+
+def setup(app):
+    todos, _ = app.collection("todos", "todo", todo_text, index_by="done")
+    app.todos = todos
+
+    def respond(req, todo_id, rev):
+        # Just the affected todo (null if deleted) and the revision it produced
+        req.send_json({"id": todo_id, "todo": todos.item(todo_id), "rev": rev})
+
+    @app.route("POST", "/api/todos")
+    def add(req, query):
+        data = read_json(req.body())
+        if not isinstance(data, dict):
+            req.send_error(400, "body must be a JSON object")
+            return
+        text = data.get("text", "")
+        if not isinstance(text, str):
+            req.send_error(400, "text must be a string")
+            return
+        todo_id, rev = todos.add({"text": text, "done": False, "created": datetime.now().isoformat()})
+        respond(req, todo_id, rev)
+
+    @app.route("POST", "/api/todos/{action}")
+    def change(req, query, action):
+        data = read_json(req.body())
+        if not isinstance(data, dict):
+            req.send_error(400, "body must be a JSON object")
+            return
+        todo_id = data.get("id")
+        if not isinstance(data.get("text", ""), str):
+            req.send_error(400, "text must be a string")
+            return
+        if action not in ("toggle", "delete", "edit"):
+            req.send_error(404)
+            return
+        if not isinstance(todo_id, str):
+            req.send_error(400, "id must be a string")
+            return
+        rev = None
+        if action != "edit":
+            rev = todos.commit(action, id=todo_id)
+        elif "text" in data:
+            rev = todos.commit("edit", id=todo_id, text=data["text"])
+        # None: the todo does not exist (any more), nothing changed
+        respond(req, todo_id, todos.seq if rev is None else rev)
+
+    def prepare(op):
+        action, todo_id = op.get("op"), op.get("id")
+        if not isinstance(op.get("text", ""), str):
+            raise ValueError("text must be a string")
+        if action == "add":
+            return "add", {"item": {
+                "text": op.get("text", ""), "done": False, "created": datetime.now().isoformat(),
+            }}
+        if not isinstance(todo_id, str):
+            raise ValueError("id missing")
+        if action in ("toggle", "delete"):
+            return action, {"id": todo_id}
+        if action == "edit" and "text" in op:
+            return "edit", {"id": todo_id, "text": op["text"]}
+        raise ValueError(f"not a todo operation: {action}")
+
+    app.batch_route("todos", todos, prepare)
+
+    # Vecchie URL di ipad-server.py
+    app.route("POST", "/api/todos/add")(add)
+
+    @app.route("POST", "/api/todos/{action}/{todo_id}")
+    def change_legacy(req, query, action, todo_id):
+        read_json(req.body())  # Ignored, but read so keep-alive stays in sync
+        if action not in ("toggle", "delete"):
+            req.send_error(404)
+            return
+        rev = todos.commit(action, id=todo_id)
+        respond(req, todo_id, todos.seq if rev is None else rev)
+
+    app.add_tab("todos", "✅ Todo", HTML, CSS, JS)
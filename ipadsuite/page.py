@@ -0,0 +1,131 @@
+"""
+App page
+One page with a tab per module. Each module adds its tab with
+App.add_tab(): the panel's HTML, its CSS and its JS, which registers
+``loaders.<event type> = loadSomething`` to be called on start and when
+the server pushes that event.
+"""
+
+from .static import build_app
+
+PAGE_CSS = '''
+*{margin:0;padding:0;box-sizing:border-box}
+body{font-family:-apple-system,sans-serif;background:#f5f5f5;padding:10px}
+.tabs{display:flex;gap:5px;margin-bottom:10px;border-bottom:2px solid #ddd}
+.tab-btn{padding:10px 15px;background:none;border:none;cursor:pointer;font-weight:500;color:#999}
+.tab-btn.active{color:#007AFF;border-bottom:3px solid #007AFF;margin-bottom:-2px}
+.card{background:white;padding:15px;border-radius:10px;margin-bottom:10px}
+input,textarea{width:100%;padding:10px;border:1px solid #ddd;border-radius:5px;margin-bottom:10px;font-family:inherit}
+textarea{min-height:80px;resize:vertical}
+button{background:#007AFF;color:white;border:none;padding:10px 15px;border-radius:5px;cursor:pointer;font-weight:500}
+button:active{background:#005A9C}
+#content>div{display:none}
+#content>div.active{display:block}
+.hidden{display:none}
+'''
+
+PAGE_JS = '''
+function switchTab(tab){
+  document.querySelectorAll('#content>div').forEach(d=>d.classList.remove('active'));
+  document.getElementById(tab).classList.add('active');
+  document.querySelectorAll('.tab-btn').forEach(b=>b.classList.remove('active'));
+  event.target.classList.add('active');
+}
+
+// Local copies, kept in sync with ?since=rev deltas
+const state={};
+const revs={};
+const loaders={};  // event type -> function that reloads it
+
+async function sync(kind){
+  const rev=revs[kind]===undefined?null:revs[kind];
+  const r=await fetch(rev===null?`/api/${kind}`:`/api/${kind}?since=${rev}`);
+  const d=await r.json();
+  if(d[kind])state[kind]=d[kind];
+  else{Object.assign(state[kind],d.changed);d.deleted.forEach(id=>delete state[kind][id])}
+  revs[kind]=d.rev;
+}
+
+async function post(url,body){
+  const r=await fetch(url,{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(body)});
+  return r.json();
+}
+
+function apply(kind,id,item){
+  if(item)state[kind][id]=item;else delete state[kind][id];
+}
+'''
+
+# After the modules' JS: first load, then listen for changes
+PAGE_JS_END = '''
+// Il server avvisa quando qualcosa cambia (SSE, o long-poll per Safari vecchi)
+const pending={};
+function later(fn){
+  if(pending[fn.name])return;
+  pending[fn.name]=setTimeout(()=>{pending[fn.name]=null;fn()},100);
+}
+
+function onEvent(ev){
+  if(ev.type==='reset'){
+    for(const kind in revs)revs[kind]=null;
+    Object.values(loaders).forEach(later);
+  }else if(loaders[ev.type])later(loaders[ev.type]);
+}
+
+async function pollEvents(){
+  let since='';
+  for(;;){
+    try{
+      const r=await fetch(`/api/events/poll?since=${since}`);
+      const d=await r.json();
+      if(d.reset)onEvent({type:'reset'});
+      d.events.forEach(onEvent);
+      since=d.last;
+    }catch(e){await new Promise(r=>setTimeout(r,5000))}
+  }
+}
+
+function listen(){
+  if(!window.EventSource)return pollEvents();
+  const source=new EventSource('/api/events');
+  source.onmessage=e=>onEvent(JSON.parse(e.data));
+  source.onopen=()=>Object.values(loaders).forEach(later);  // Recupera quanto perso
+}
+
+Object.values(loaders).forEach(fn=>fn());
+listen();
+'''
+
+PAGE_HTML = '''<!DOCTYPE html>
+<html lang="it">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>iPad Suite</title>
+<link rel="stylesheet" href="{{css}}">
+</head>
+<body>
+<div class="tabs">
+{{tabs}}
+</div>
+
+<div id="content">
+{{panels}}
+</div>
+
+<script src="{{js}}"></script>
+</body>
+</html>'''
+
+
+def build_page(tabs):
+    """Assets for the page made of ``tabs``: (id, label, html, css, js) tuples."""
+    buttons, panels = [], []
+    for i, (id, label, html, _, _) in enumerate(tabs):
+        active = " active" if i == 0 else ""
+        buttons.append(f'<button class="tab-btn{active}" onclick="switchTab(\'{id}\')">{label}</button>')
+        panels.append(f'\n<div id="{id}" class="{active.strip()}">\n{html.strip()}\n</div>\n')
+    html = PAGE_HTML.replace("{{tabs}}", "\n".join(buttons)).replace("{{panels}}", "".join(panels))
+    css = PAGE_CSS + "".join(tab[3] for tab in tabs)
+    js = PAGE_JS + "".join(tab[4] for tab in tabs) + PAGE_JS_END
+    return build_app(html, css, js)
@@ -0,0 +1,126 @@
+"""
+JSON payloads
+Encodes API responses and parses request bodies with orjson when it
+is installed (stdlib json otherwise), and keeps the encoded full
+state of each collection per revision: repeated GET /api/todos or
+/api/notes reuse the same bytes, and a client that already has the
+revision gets a 304. Pages in creation order come from the
+collection's index instead (see send_page()).
+"""
+
+import json
+import threading
+import time
+
+from . import metrics
+from .static import etag_matches
+
+try:
+    import orjson
+except ImportError:  # orjson è opzionale, json della stdlib basta
+    orjson = None
+
+ENCODE_SECONDS = metrics.histogram("ipad_json_encode_seconds", "Time to encode a JSON response.")
+
+
+def dumps(data):
+    """``data`` as UTF-8 JSON bytes."""
+    started = time.perf_counter()
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+    ENCODE_SECONDS.observe(time.perf_counter() - started)
+    return body
+
+
+def loads(data):
+    """Parse JSON from bytes (or str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class CollectionPayload:
+    """Encoded ``{"rev": ..., key: items}`` of a collection, rebuilt only when the revision moves."""
+
+    def __init__(self, collection, key):
+        self.collection = collection
+        self.key = key
+        self.hits = 0
+        self.misses = 0
+        self._cached = (None, None, None)  # rev, etag, body
+        self._lock = threading.Lock()
+
+    def current(self):
+        """(etag, body) for the current revision."""
+        rev, etag, body = self._cached
+        if rev == self.collection.seq:
+            self.hits += 1
+            return etag, body
+        with self._lock:  # One encode per revision, even under concurrent GETs
+            rev, etag, body = self._cached
+            if rev != self.collection.seq:
+                rev, items = self.collection.state()
+                etag = f'W/"{self.key}-{rev}"'
+                body = dumps({"rev": rev, self.key: items})
+                self._cached = (rev, etag, body)
+                self.misses += 1
+            else:
+                self.hits += 1
+        return etag, body
+
+
+def send_json_bytes(handler, body, etag=None, headers=None):
+    """Send an encoded JSON body; answers 304 when ``etag`` matches If-None-Match."""
+    status = 304 if etag and etag_matches(handler.headers.get("If-None-Match"), etag) else 200
+    handler.send_response(status)
+    if status == 200:
+        handler.send_header("Content-Type", "application/json")
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    if etag:
+        handler.send_header("ETag", etag)
+        handler.send_header("Cache-Control", "no-cache")
+    handler.send_header("Content-Length", str(len(body)) if status == 200 else "0")
+    handler.end_headers()
+    if status == 200:
+        handler.wfile.write(body)
+
+
+def send_page(handler, collection, query, headers=None, newest_first=False):
+    """GET /api/<key>?done=true|false&limit=50&cursor=...: one page in creation order.
+
+    The filter is on the collection's ``index_by`` field ("done" for
+    todos, "read" for feed items). Answers {"rev", "items": [{"id",
+    ...}], "next": cursor or null}.
+    """
+    field = collection.index.field
+    flag = query.get(field, [None])[0] if field else None
+    limit = query.get("limit", ["50"])[0]
+    if flag not in (None, "true", "false") or not limit.isdigit():
+        handler.send_error(400, f"{field} must be true or false, limit a number")
+        return
+    value = {"true": True, "false": False}.get(flag, collection.index.ANY)
+    try:
+        rev, items, cursor = collection.page(value, query.get("cursor", [None])[0],
+                                             min(max(int(limit), 1), 500), newest_first)
+    except ValueError:
+        handler.send_error(400, "Bad cursor")
+        return
+    body = dumps({"rev": rev, "items": [{"id": item_id, **item} for item_id, item in items],
+                  "next": cursor})
+    send_json_bytes(handler, body, headers=headers)
+
+
+def send_collection(handler, payload, since=None, headers=None):
+    """GET /api/<key>[?since=rev]: a delta when possible, else the cached full state."""
+    if since is not None and since.isdigit():
+        delta = payload.collection.changes(int(since))
+        if delta is not None:
+            rev, changed, deleted = delta
+            send_json_bytes(handler, dumps({"rev": rev, "changed": changed, "deleted": deleted}),
+                            headers=headers)
+            return
+    etag, body = payload.current()
+    send_json_bytes(handler, body, etag, headers)
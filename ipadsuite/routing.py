@@ -0,0 +1,145 @@
+"""
+Routing
+Routes are compiled once at startup: fixed paths go in a dict, paths
+with parameters ("/blobs/{digest}", "/api/todos/toggle/{id}") in a
+trie of path segments. Dispatching a request is one dict lookup for
+most of the API and a walk of a few segments for the rest, instead of
+a chain of ``path.startswith(...)``. Trie results are remembered per
+path, since clients ask for the same few paths over and over.
+"""
+
+CACHE_SIZE = 4096  # Path trie lookups remembered (the cache is emptied when full)
+
+
+def split_target(target):
+    """(path, query string) of a request target; routes are matched on the path."""
+    path, _, qs = target.partition("?")
+    return path, qs
+
+
+class Route:
+    """A handler with what the server needs to know before calling it."""
+
+    __slots__ = ("pattern", "handler", "body_limit")
+
+    def __init__(self, pattern, handler, body_limit=None):
+        self.pattern = pattern        # Also the route's label in the metrics
+        self.handler = handler        # handler(request, query, **params)
+        self.body_limit = body_limit  # None: AppHandler.max_body
+
+
+class _Node:
+    __slots__ = ("children", "param", "param_node", "rest", "routes")
+
+    def __init__(self):
+        self.children = {}     # Literal segment -> _Node
+        self.param = None      # "{id}": name of the parameter ...
+        self.param_node = None  # ... and the node after it
+        self.rest = None       # "{path*}": (name, {method: Route}), matches the rest of the path
+        self.routes = {}       # method -> Route, when a path ends here
+
+
+class Router:
+
+    def __init__(self):
+        self._exact = {}  # path -> {method: Route}
+        self._root = _Node()
+        self._found = {}  # path -> ({method: Route} or None, params), from the trie
+
+    def add(self, methods, pattern, handler, body_limit=None):
+        """Route ``methods`` ("GET" or ("GET", "HEAD")) on ``pattern`` to ``handler``."""
+        if isinstance(methods, str):
+            methods = (methods,)
+        route = Route(pattern, handler, body_limit)
+        if "{" not in pattern:
+            table = self._exact.setdefault(pattern, {})
+        else:
+            table = self._insert(pattern)
+        for method in methods:
+            if method in table:
+                raise ValueError(f"{method} {pattern} is already routed")
+            table[method] = route
+        self._found.clear()
+        return route
+
+    def _insert(self, pattern):
+        node = self._root
+        for segment in pattern.split("/")[1:]:
+            if segment.startswith("{") and segment.endswith("*}"):
+                name = segment[1:-2]
+                if node.rest is None:
+                    node.rest = (name, {})
+                return node.rest[1]
+            if segment.startswith("{") and segment.endswith("}"):
+                name = segment[1:-1]
+                if node.param is None:
+                    node.param, node.param_node = name, _Node()
+                elif node.param != name:
+                    raise ValueError(f"{pattern}: parameter {{{node.param}}} already used here")
+                node = node.param_node
+            else:
+                node = node.children.setdefault(segment, _Node())
+        return node.routes
+
+    def _walk(self, path, params):
+        """{method: Route} for ``path`` in the trie, filling ``params``; None if no match.
+
+        Literal segments win over parameters: no backtracking.
+        """
+        node = self._root
+        segments = path.split("/")
+        for i, segment in enumerate(segments):
+            if not i:
+                continue  # Before the leading "/"
+            child = node.children.get(segment)
+            if child is not None:
+                node = child
+            elif node.param is not None and segment:
+                params[node.param] = segment
+                node = node.param_node
+            elif node.rest is not None:
+                params[node.rest[0]] = "/".join(segments[i:])
+                return node.rest[1]
+            else:
+                return None
+        if node.routes:
+            return node.routes
+        return node.rest[1] if node.rest is not None else None
+
+    def _trie(self, path):
+        found = self._found.get(path)
+        if found is None:
+            params = {}
+            found = (self._walk(path, params), params)
+            if len(self._found) >= CACHE_SIZE:
+                self._found.clear()
+            self._found[path] = found
+        return found
+
+    def match(self, method, path):
+        """(Route, params), (None, allowed methods) on a wrong method, (None, None) if unknown.
+
+        ``params`` may be shared between requests: do not modify it.
+        """
+        exact = self._exact.get(path)
+        if exact is not None:
+            route = exact.get(method)
+            if route is not None:
+                return route, {}
+        # "/api/todos/add" is fixed, but "/api/todos/{action}" may still take this method
+        table, params = self._trie(path)
+        if table is not None:
+            route = table.get(method)
+            if route is not None:
+                return route, params
+        elif exact is None:
+            return None, None
+        allowed = set(exact or ()) | set(table or ())
+        return None, (sorted(allowed) or None)
+
+    def label(self, path):
+        """Route pattern for the metrics ("/blobs/{digest}"), "other" for unknown paths."""
+        table = self._exact.get(path) or self._trie(path)[0]
+        for route in (table or {}).values():
+            return route.pattern
+        return "other"
@@ -0,0 +1,217 @@
+"""
+Full-text search
+An inverted index over todos, notes (with their comments) and the
+cached RSS entries, updated on every change instead of scanning
+everything per query. Text is lowercased and stripped of accents,
+so "perche" finds "perché", and query words also match as prefixes.
+Results are ranked with BM25.
+"""
+
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+TOKEN_RE = re.compile(r"\w+")
+MAX_EXPANSIONS = 200  # Termini considerati per un prefisso
+PREFIX_WEIGHT = 0.7   # Un prefisso conta meno della parola intera
+K1, B = 1.2, 0.75
+
+
+def fold(text):
+    """Lowercase and drop accents: "Perché È" -> "perche e"."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold(text))
+
+
+class SearchIndex:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._postings = {}  # term -> {doc_id: term frequency}
+        self._docs = {}      # doc_id -> (distinct terms, length, meta)
+        self._kinds = {}     # kind -> set of doc_ids
+        self._terms = []     # Sorted vocabulary, for prefix lookups
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, doc_id, text, meta):
+        """Index (or re-index) a document; ``meta`` is returned with results."""
+        counts = Counter(tokenize(text))
+        with self.lock:
+            self.remove(doc_id)
+            for term, tf in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._terms, term)
+                postings[doc_id] = tf
+            length = sum(counts.values())
+            self._docs[doc_id] = (tuple(counts), length, meta)
+            self._kinds.setdefault(meta.get("type"), set()).add(doc_id)
+            self._total_length += length
+
+    def remove(self, doc_id):
+        with self.lock:
+            doc = self._docs.pop(doc_id, None)
+            if doc is None:
+                return
+            terms, length, meta = doc
+            for term in terms:
+                postings = self._postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self._postings[term]
+                    del self._terms[bisect.bisect_left(self._terms, term)]
+            self._kinds[meta.get("type")].discard(doc_id)
+            self._total_length -= length
+
+    def replace_kind(self, kind, docs):
+        """Make the documents of one kind exactly ``docs`` ({doc_id: (text, meta)})."""
+        with self.lock:
+            for doc_id in self._kinds.get(kind, set()) - docs.keys():
+                self.remove(doc_id)
+            for doc_id, (text, meta) in docs.items():
+                current = self._docs.get(doc_id)
+                if current is None or current[2] != meta:
+                    self.add(doc_id, text, meta)
+
+    def _expand(self, token):
+        """Vocabulary terms matched by a query token, with their weights."""
+        matches = {}
+        if token in self._postings:
+            matches[token] = 1.0
+        if len(token) >= 2:
+            i = bisect.bisect_left(self._terms, token)
+            while i < len(self._terms) and len(matches) < MAX_EXPANSIONS:
+                term = self._terms[i]
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_WEIGHT)
+                i += 1
+        return matches
+
+    def search(self, query, offset=0, limit=20):
+        """(total matches, one page of results) for documents matching every word."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return 0, []
+        with self.lock:
+            n = len(self._docs)
+            docs = self._docs
+            # BM25: boost * tf / (tf + base + slope * length)
+            base = K1 * (1 - B)
+            slope = K1 * B * n / self._total_length if self._total_length else 0
+            expanded = []
+            for token in tokens:
+                terms = [(self._postings[t], w) for t, w in self._expand(token).items()]
+                if not terms:
+                    return 0, []
+                terms = [(p, w * (K1 + 1) * math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)))
+                         for p, w in terms]
+                expanded.append((sum(len(p) for p, _ in terms), terms))
+            expanded.sort(key=lambda x: x[0])  # Rarest word first: fewer candidates
+
+            scores = None
+            for matches, terms in expanded:
+                token_scores = {}
+                if scores is not None and len(scores) * len(terms) < matches:
+                    # Few candidates left: probe them instead of walking the postings
+                    for doc_id in scores:
+                        norm = base + slope * docs[doc_id][1]
+                        for postings, boost in terms:
+                            tf = postings.get(doc_id)
+                            if tf:
+                                score = boost * tf / (tf + norm)
+                                if score > token_scores.get(doc_id, 0):
+                                    token_scores[doc_id] = score
+                else:
+                    for postings, boost in terms:
+                        for doc_id, tf in postings.items():
+                            if scores is not None and doc_id not in scores:
+                                continue
+                            score = boost * tf / (tf + base + slope * docs[doc_id][1])
+                            if score > token_scores.get(doc_id, 0):
+                                token_scores[doc_id] = score
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {d: s + scores[d] for d, s in token_scores.items()}
+                if not scores:
+                    return 0, []
+            top = heapq.nlargest(offset + limit, scores.items(), key=lambda x: x[1])[offset:]
+            results = [dict(self._docs[doc_id][2], score=round(score, 3)) for doc_id, score in top]
+        return len(scores), results
+
+
+def as_text(value):
+    """``value`` if it is a string, else "": a bad record must not break indexing."""
+    return value if isinstance(value, str) else ""
+
+
+def snippet(text, length=160):
+    return text if len(text) <= length else text[:length - 1] + "…"
+
+
+def watch_collection(index, collection, kind, text_of):
+    """Index a collection now and keep it indexed on every commit.
+
+    ``text_of(item)`` returns the searchable text of an item.
+    """
+    def reindex(item_id, item):
+        doc_id = f"{kind}:{item_id}"
+        if item is None:
+            index.remove(doc_id)
+        else:
+            meta = {"type": kind, "id": item_id, "text": snippet(as_text(item.get("text")))}
+            index.add(doc_id, text_of(item), meta)
+
+    def on_commit(rec):
+        # Read the item under the index lock, so the last update always wins
+        with index.lock:
+            for sub in rec["ops"] if rec["op"] == "batch" else (rec,):
+                reindex(sub["id"], collection.item(sub["id"]))
+
+    with index.lock:
+        for item_id, item in collection.copy().items():
+            reindex(item_id, item)
+    collection.listeners.append(on_commit)
+
+
+def index_feeds(index, feed_cache):
+    """Mirror the cached RSS entries into the index."""
+    docs = {}
+    for entry in feed_cache.snapshot()["feeds"]:
+        meta = {"type": "rss", "id": entry["link"], "text": entry["title"], "source": entry["source"]}
+        docs[f"rss:{entry['link']}"] = (f"{entry['title']} {entry['source']}", meta)
+    index.replace_kind("rss", docs)
+
+
+def todo_text(todo):
+    return as_text(todo.get("text"))
+
+
+def note_text(note):
+    comments = " ".join(as_text(c.get("text")) for c in note.get("comments", []) if isinstance(c, dict))
+    return f"{as_text(note.get('text'))} {comments}"
+
+
+def search_payload(index, query):
+    """/api/search payload for parsed query args: ?q=...&offset=0&limit=20."""
+    q = query.get("q", [""])[0]
+    try:
+        offset = max(int(query.get("offset", ["0"])[0]), 0)
+        limit = min(max(int(query.get("limit", ["20"])[0]), 1), 100)
+    except ValueError:
+        offset, limit = 0, 20
+    total, results = index.search(q, offset, limit)
+    return {"q": q, "total": total, "offset": offset, "limit": limit, "results": results}
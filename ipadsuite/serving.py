@@ -0,0 +1,456 @@
+"""
+Concurrent HTTP serving
+A bounded thread pool in front of http.server, with HTTP/1.1
+keep-alive and graceful shutdown on Ctrl+C / SIGTERM. Between
+requests a keep-alive connection waits in a selector, not in a worker,
+and goes back to the pool when the client sends again.
+Workers only append each finished request to a deque; a background
+thread folds them into the metrics and the access log.
+"""
+
+import http.server
+import selectors
+import signal
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+from .bodies import CHUNK, BodyError, BodyReader
+from .events import Wakeup
+from .routing import split_target
+
+LINGER_BYTES = 4 * 1024 * 1024  # Quanto corpo non letto scartare prima di chiudere dopo un 413
+SKIP_BYTES = 64 * 1024  # Corpo non letto scartato per tenere viva la connessione; oltre si chiude
+IDLE_TIMEOUT = 15  # Secondi di inattività prima di chiudere una connessione keep-alive
+NEXT_REQUEST_WAIT = 0.02  # Secondi che un worker libero aspetta la richiesta dopo, prima di parcheggiare
+MAX_IDLE = 1024  # Keep-alive connections parked at most; past that the oldest is closed
+
+REQUESTS = metrics.counter("ipad_http_requests_total", "HTTP requests.", ["route", "status"])
+REQUEST_SECONDS = metrics.histogram("ipad_http_request_seconds", "Time to handle a request.", ["route"])
+REQUEST_BYTES = metrics.histogram("ipad_http_request_body_bytes", "Request body size.", ["route"],
+                                  metrics.SIZE_BUCKETS)
+RESPONSE_BYTES = metrics.histogram("ipad_http_response_body_bytes", "Response body size (Content-Length).",
+                                   ["route"], metrics.SIZE_BUCKETS)
+
+
+class RequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Base handler: keep-alive, idle timeout and shutdown tracking.
+
+    Subclasses give ``body_limit()``, the largest body the current
+    request may send, and ``route_label(path)``, its metrics label.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+    timeout = 10  # Seconds a request may stall; idle connections wait in IdleConnections
+
+    def handle(self):
+        # Requests already sent, or sent within NEXT_REQUEST_WAIT while no
+        # connection waits for a worker, are served here; then the
+        # connection is parked and the worker goes back to the pool
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if not self._pending():
+                self.server.park(self.connection, self.client_address)
+                return
+            self.handle_one_request()
+
+    def _pending(self):
+        """True if the next request (or EOF) is buffered or arrives soon."""
+        try:
+            self.connection.settimeout(0)  # Non-blocking: peek() only takes what is there
+            try:
+                if self.rfile.peek(1):
+                    return True
+            finally:
+                self.connection.settimeout(self.timeout)
+            return self.server.linger(self.connection)
+        except OSError:
+            self.close_connection = True
+            return False
+
+    def handle_one_request(self):
+        # Waiting for the next request line: the connection is idle
+        self.server.connection_idle(self.connection)
+        self._started = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self._started is not None:
+                self._record()
+            self.server.connection_done(self.connection)
+
+    def parse_request(self):
+        self.server.connection_busy(self.connection)
+        ok = super().parse_request()
+        if self.server.closing:
+            self.close_connection = True
+        if ok:
+            self._started = time.perf_counter()
+            self._status = 0
+            self._sent = 0
+            self._reader = None
+        return ok
+
+    def log_request(self, code="-", size="-"):
+        # Called by send_response(): remember the status, the access log does the rest
+        self._status = int(code) if isinstance(code, int) else 0
+
+    def log_message(self, format, *args):
+        pass  # Requests, errors included, go to the access log
+
+    def send_response(self, code, message=None):
+        super().send_response(code, message)
+        if self._started is not None and not self.close_connection:
+            self._skip_body()
+
+    def _skip_body(self):
+        """Drop a body the handler left unread (404, 405, early 400...).
+
+        Otherwise it would be parsed as the next request on the
+        connection. A small body is read and thrown away; a bigger one,
+        or one the handler began reading, closes the connection instead.
+        """
+        reader = self._reader
+        if reader is None:
+            if "Content-Length" not in self.headers and "Transfer-Encoding" not in self.headers:
+                return
+            try:
+                reader = self._reader = BodyReader(self.rfile, self.headers, SKIP_BYTES)
+                for _ in reader:
+                    pass
+                return
+            except (BodyError, OSError):
+                pass
+        elif reader.done:
+            return
+        self.send_header("Connection", "close")  # Also sets close_connection
+
+    def send_header(self, keyword, value):
+        if keyword == "Content-Length":
+            self._sent = int(value)
+        super().send_header(keyword, value)
+
+    def _record(self):
+        # Hot path: one append, the rest happens in PooledHTTPServer.flush_requests()
+        if self._reader is not None:
+            received = self._reader.total
+        else:
+            received = self.headers.get("Content-Length") or 0
+        self.server.finished.append((
+            time.time(), self.client_address[0], self.command, self.path, self.route_label,
+            self._status, received, self._sent, time.perf_counter() - self._started,
+        ))
+
+    def body(self):
+        """BodyReader for this request, bounded by the route's limit (raises BodyError)."""
+        self._reader = BodyReader(self.rfile, self.headers, self.body_limit())
+        return self._reader
+
+    def reject_body(self, error):
+        """Answer a BodyError and close, draining a little of the unread body first.
+
+        Closing with unread data makes the kernel send a RST, and the
+        client may then never see the 413.
+        """
+        self.send_error(error.status, error.message)
+        self.wfile.flush()
+        try:
+            self.connection.shutdown(socket.SHUT_WR)
+            self.connection.settimeout(1)
+            drained = 0
+            while drained < LINGER_BYTES:
+                data = self.connection.recv(CHUNK)
+                if not data:
+                    break
+                drained += len(data)
+        except OSError:
+            pass
+
+    def handle_expect_100(self):
+        # Expect: 100-continue lets us refuse an oversized body before it is sent
+        length = self.headers.get("Content-Length", "")
+        if length.isdigit() and int(length) > self.body_limit():
+            self.send_error(413)
+            return False
+        return super().handle_expect_100()
+
+    def detach(self):
+        """Hand the connection over to someone else (e.g. the event hub).
+
+        The worker returns, but the socket stays open.
+        """
+        self.wfile.flush()
+        self.close_connection = True
+        self.server.detach(self.connection)
+
+
+class IdleConnections:
+    """Keep-alive connections between two requests, watched by one thread.
+
+    A parked socket holds no worker: once the client sends its next
+    request (or closes) it is handed to ``serve(sock, address)``. One
+    idle for ``timeout`` seconds is closed, and so is the oldest when
+    more than ``limit`` are parked.
+    """
+
+    def __init__(self, serve, timeout=IDLE_TIMEOUT, limit=MAX_IDLE):
+        self.serve = serve
+        self.timeout = timeout
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._incoming = []  # (sock, address) waiting to be registered
+        self._parked = {}  # sock -> (deadline, address)
+        self._order = deque()  # (deadline, sock), oldest first; stale entries are skipped
+        self._selector = selectors.DefaultSelector()
+        self._wakeup = Wakeup(self._selector)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="http-idle", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._parked)
+
+    def add(self, sock, address):
+        with self._lock:
+            if self._running:
+                self._incoming.append((sock, address))
+                sock = None
+        if sock is not None:  # Closed meanwhile
+            _close(sock)
+            return
+        self._wakeup.wake()
+
+    def close(self):
+        """Close every parked connection and stop the thread."""
+        with self._lock:
+            self._running = False
+        self._wakeup.wake()
+        self._thread.join()
+
+    def _run(self):
+        while self._running:
+            timeout = max(0.0, self._order[0][0] - time.monotonic()) if self._order else None
+            for key, mask in self._selector.select(timeout):
+                if key.fileobj is self._wakeup.reader:
+                    self._wakeup.drain()
+                    continue
+                # The next request (or EOF): back to a worker
+                sock = key.fileobj
+                self._selector.unregister(sock)
+                _, address = self._parked.pop(sock)
+                self.serve(sock, address)
+
+            with self._lock:
+                incoming, self._incoming = self._incoming, []
+            now = time.monotonic()
+            for sock, address in incoming:
+                self._parked[sock] = (now + self.timeout, address)
+                self._order.append((now + self.timeout, sock))
+                self._selector.register(sock, selectors.EVENT_READ)
+            while self._order and (self._order[0][0] <= now or len(self._parked) > self.limit):
+                deadline, sock = self._order.popleft()
+                parked = self._parked.get(sock)
+                if parked is not None and parked[0] == deadline:
+                    self._drop(sock)
+
+        with self._lock:
+            incoming, self._incoming = self._incoming, []
+        for sock, _ in incoming:
+            _close(sock)
+        for sock in list(self._parked):
+            self._drop(sock)
+        self._selector.close()
+        self._wakeup.close()
+
+    def _drop(self, sock):
+        self._selector.unregister(sock)
+        del self._parked[sock]
+        _close(sock)
+
+
+def _close(sock):
+    try:
+        sock.shutdown(socket.SHUT_WR)
+    except OSError:
+        pass
+    sock.close()
+
+
+class PooledHTTPServer(http.server.HTTPServer):
+    """HTTPServer that hands each connection to a fixed-size worker pool."""
+
+    allow_reuse_address = True
+
+    def __init__(self, address, handler, workers=16, access_log=None, flush_interval=1.0):
+        super().__init__(address, handler)
+        self.workers = workers
+        self.access_log = access_log
+        self.finished = deque()  # Requests done since the last flush_requests()
+        self._route_metrics = {}  # route -> (latency, request size, response size)
+        self._busy = set()
+        self.closing = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self._idle = set()
+        self._detached = set()
+        self._waiting = 0  # Connections submitted to the pool, not yet picked up by a worker
+        self._parking = {}  # conn -> client address, until its handler returns
+        self._idle_lock = threading.Lock()
+        self._keepalive = IdleConnections(self._resume)
+        self._flush_stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,),
+                                         name="request-recorder", daemon=True)
+        self._flusher.start()
+        metrics.REGISTRY.before_render.append(self.flush_requests)
+        metrics.callback("gauge", "ipad_http_requests_in_flight", "Requests being handled.", [],
+                         lambda: [((), len(self._busy))])
+        metrics.callback("gauge", "ipad_http_connections_idle", "Keep-alive connections between requests.", [],
+                         lambda: [((), len(self._keepalive))])
+
+    def process_request(self, request, client_address):
+        with self._idle_lock:
+            self._waiting += 1
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        with self._idle_lock:
+            self._waiting -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def _resume(self, request, client_address):
+        try:
+            self.process_request(request, client_address)
+        except RuntimeError:  # Pool shut down
+            with self._idle_lock:
+                self._waiting -= 1
+            _close(request)
+
+    def linger(self, conn):
+        """Wait up to NEXT_REQUEST_WAIT for ``conn`` to be readable, unless a connection needs the worker."""
+        deadline = time.monotonic() + NEXT_REQUEST_WAIT
+        with selectors.DefaultSelector() as selector:
+            selector.register(conn, selectors.EVENT_READ)
+            while not self._waiting and not self.closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if selector.select(min(remaining, 0.002)):
+                    return True
+        return False
+
+    def detach(self, conn):
+        with self._idle_lock:
+            self._detached.add(conn)
+
+    def park(self, conn, client_address):
+        """Keep ``conn`` open once its handler returns, until it has a new request."""
+        with self._idle_lock:
+            self._parking[conn] = client_address
+
+    def shutdown_request(self, request):
+        with self._idle_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+            client_address = self._parking.pop(request, None)
+        if client_address is not None and not self.closing:
+            self._keepalive.add(request, client_address)
+            return
+        super().shutdown_request(request)
+
+    def flush_requests(self):
+        """Fold the finished requests into the metrics and write them to the access log."""
+        # popleft(), not swapping the list: workers keep appending meanwhile, and
+        # this runs both on the recorder thread and before /metrics renders
+        done = []
+        try:
+            for _ in range(len(self.finished)):
+                done.append(self.finished.popleft())
+        except IndexError:  # The other caller took the rest
+            pass
+        if not done:
+            return
+        for ts, client, method, path, route_label, status, received, sent, elapsed in done:
+            route = route_label(split_target(path)[0])
+            children = self._route_metrics.get(route)
+            if children is None:
+                children = self._route_metrics[route] = (
+                    REQUEST_SECONDS.labels(route), REQUEST_BYTES.labels(route), RESPONSE_BYTES.labels(route))
+            latency, request_size, response_size = children
+            latency.observe(elapsed)
+            if isinstance(received, str):  # The client's Content-Length header
+                received = int(received) if received.isdigit() else 0
+            if received or method in ("POST", "PUT"):
+                request_size.observe(received)
+            response_size.observe(sent)
+            REQUESTS.labels(route, status).inc()
+        if self.access_log is not None:
+            self.access_log.write(done)
+
+    def _flush_loop(self, interval):
+        while not self._flush_stop.wait(interval):
+            self.flush_requests()
+
+    def connection_idle(self, conn):
+        with self._idle_lock:
+            self._idle.add(conn)
+        if self.closing:
+            self._wake(conn)
+
+    def connection_busy(self, conn):
+        with self._idle_lock:
+            self._idle.discard(conn)
+            self._busy.add(conn)
+
+    def connection_done(self, conn):
+        with self._idle_lock:
+            self._idle.discard(conn)
+            self._busy.discard(conn)
+
+    def _wake(self, conn):
+        # Unblocks a keep-alive read so the worker can exit
+        try:
+            conn.shutdown(socket.SHUT_RD)
+        except OSError:
+            pass
+
+    def close_gracefully(self):
+        """Stop accepting, drop idle keep-alive connections, finish in-flight requests."""
+        self.closing = True
+        with self._idle_lock:
+            idle = list(self._idle)
+        for conn in idle:
+            self._wake(conn)
+        self._keepalive.close()
+        self._pool.shutdown(wait=True)
+        self.server_close()
+        self._flush_stop.set()
+        self._flusher.join()
+        self.flush_requests()
+        metrics.REGISTRY.before_render.remove(self.flush_requests)
+        if self.access_log is not None:
+            self.access_log.close()
+
+
+def serve(httpd):
+    """serve_forever() until Ctrl+C or SIGTERM, then shut down gracefully."""
+    def on_sigterm(signum, frame):
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, on_sigterm)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print("\n🛑 Arresto in corso...")
+    httpd.close_gracefully()
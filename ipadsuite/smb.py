@@ -0,0 +1,209 @@
+"""
+SMB share browser
+Listings come from os.scandir() with one stat per entry (instead of
+isdir + getsize round-trips), are confined to the share root, and
+are cached for a few seconds per (path, directory mtime).
+Files are sent with sendfile() and support Range requests, so
+memory use per download does not depend on the file size.
+"""
+
+import mimetypes
+import os
+import re
+import stat
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+from . import metrics
+from .static import etag_matches
+
+SCAN_SECONDS = metrics.histogram("ipad_smb_scan_seconds", "Time to scandir + stat a share directory.")
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+SORT_KEYS = {
+    "name": lambda e: e["name"].lower(),
+    "size": lambda e: e["size"],
+    "mtime": lambda e: e["mtime"],
+}
+
+
+class ShareBrowser:
+
+    def __init__(self, root, ttl=5, max_dirs=256):
+        self.root = root
+        self.ttl = ttl
+        self.max_dirs = max_dirs
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()  # abs path -> (mtime_ns, fetched_at, entries, sorted views)
+        self._lock = threading.Lock()
+
+    def resolve(self, rel):
+        """Absolute path for ``rel`` inside the share, or None if it escapes it or is invalid."""
+        root = os.path.realpath(self.root)
+        try:
+            target = os.path.realpath(os.path.join(root, (rel or "").lstrip("/")))
+        except (ValueError, OSError):  # NUL byte, name too long...
+            return None
+        if os.path.commonpath([root, target]) != root:
+            return None
+        return target
+
+    def relative(self, target):
+        rel = os.path.relpath(target, os.path.realpath(self.root))
+        return "" if rel == "." else rel
+
+    def scan(self, path):
+        """Entries of ``path``: name, is_dir, size, mtime (one stat each)."""
+        started = time.perf_counter()
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:  # Broken symlink or file vanished
+                    continue
+                is_dir = stat.S_ISDIR(st.st_mode)
+                entries.append({
+                    "name": entry.name,
+                    "is_dir": is_dir,
+                    "size": 0 if is_dir else st.st_size,
+                    "mtime": int(st.st_mtime),
+                })
+        SCAN_SECONDS.observe(time.perf_counter() - started)
+        return entries
+
+    def listing(self, path):
+        """Cached scan(); reused while the directory mtime is unchanged and the TTL holds."""
+        mtime = os.stat(path).st_mtime_ns
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == mtime and now - cached[1] < self.ttl:
+                self._cache.move_to_end(path)
+                self.hits += 1
+                return cached
+        entries = self.scan(path)
+        cached = (mtime, now, entries, {})
+        with self._lock:
+            self.misses += 1
+            self._cache[path] = cached
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.max_dirs:
+                self._cache.popitem(last=False)
+        return cached
+
+    def page(self, rel="", offset=0, limit=200, sort="name", order="asc"):
+        """One page of a directory, folders first, as the /api/smb payload."""
+        path = self.resolve(rel)
+        if path is None or not os.path.isdir(path):
+            return {"error": "Percorso non valido", "path": rel}
+        if sort not in SORT_KEYS:
+            sort = "name"
+        reverse = order == "desc"
+        _, _, entries, views = self.listing(path)
+        key = (sort, reverse)
+        ordered = views.get(key)
+        if ordered is None:
+            ordered = sorted(entries, key=SORT_KEYS[sort], reverse=reverse)
+            ordered.sort(key=lambda e: not e["is_dir"])  # Stable: keeps the order within groups
+            views[key] = ordered
+        rel = self.relative(path)
+        return {
+            "path": rel,
+            "parent": os.path.dirname(rel) if rel else None,
+            "files": ordered[offset:offset + limit],
+            "total": len(ordered),
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "order": "desc" if reverse else "asc",
+        }
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single-range ``Range`` header.
+
+    Returns None to serve the whole file (no header, or a form we do
+    not handle, like multiple ranges) and ``()`` when unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)  # bytes=-N: the last N bytes
+        if length == 0 or size == 0:  # Nothing to send, not even from an empty file
+            return ()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return ()
+    return start, end
+
+
+def not_modified(headers, etag, mtime):
+    """True if the client's validators still match (If-None-Match wins over IMS)."""
+    inm = headers.get("If-None-Match")
+    if inm is not None:
+        return etag_matches(inm, etag)
+    ims = headers.get("If-Modified-Since")
+    if ims:
+        try:
+            return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def send_share_file(handler, path):
+    """Send a file from the share with ETag/Last-Modified validation and Range support."""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        etag = f'"{st.st_ino:x}-{size:x}-{st.st_mtime_ns:x}"'
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+
+        if not_modified(handler.headers, etag, st.st_mtime):
+            handler.send_response(304)
+            handler.send_header("ETag", etag)
+            handler.send_header("Last-Modified", last_modified)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        byte_range = parse_range(handler.headers.get("Range"), size)
+        if_range = handler.headers.get("If-Range")
+        if if_range and if_range.strip() not in (etag, last_modified):
+            byte_range = None  # File changed since the client's partial copy
+
+        if byte_range == ():
+            handler.send_response(416)
+            handler.send_header("Content-Range", f"bytes */{size}")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        handler.send_response(206 if byte_range else 200)
+        if byte_range:
+            handler.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        handler.send_header("Content-Type", ctype)
+        handler.send_header("Content-Length", str(length))
+        handler.send_header("Accept-Ranges", "bytes")
+        handler.send_header("ETag", etag)
+        handler.send_header("Last-Modified", last_modified)
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Content-Disposition", f"inline; filename*=UTF-8''{quote(os.path.basename(path))}")
+        handler.end_headers()
+        if handler.command != "HEAD" and length:
+            started = time.perf_counter()
+            handler.connection.sendfile(f, offset=start, count=length)
+            metrics.SEND_SECONDS.labels("smb").observe(time.perf_counter() - started)
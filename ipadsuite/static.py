@@ -0,0 +1,118 @@
+"""
+Static assets
+The app page, its CSS and its JS are encoded once at startup, with
+gzip (and brotli, if installed) variants, and served with strong
+ETags: the iPad revalidates the page and keeps the content-hashed
+CSS/JS cached for good.
+"""
+
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # brotli è opzionale, gzip basta
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def etag_matches(header, etag):
+    """True if an If-None-Match ``header`` ("*" or a list of tags) matches ``etag``.
+
+    Weak comparison, as RFC 9110 asks for If-None-Match: W/"x" matches "x".
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for tag in header.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+class Asset:
+    """One response body with its precompressed variants."""
+
+    def __init__(self, body, ctype, immutable=False):
+        if isinstance(body, str):
+            body = body.encode()
+        self.ctype = ctype
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.cache_control = IMMUTABLE if immutable else "no-cache"
+        self.variants = {"identity": body}
+        compressed = {"gzip": gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = data
+
+    def etag(self, encoding):
+        # Each encoding is a different representation, so it gets its own tag
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+
+def negotiate(accept_encoding, available):
+    """Best encoding in ``available`` for an Accept-Encoding header."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    for encoding in ("br", "gzip"):
+        q = accepted.get(encoding, accepted.get("*", 0))
+        if encoding in available and q > 0:
+            return encoding
+    return "identity"
+
+
+def send_asset(handler, asset):
+    encoding = negotiate(handler.headers.get("Accept-Encoding"), asset.variants)
+    etag = asset.etag(encoding)
+    if etag_matches(handler.headers.get("If-None-Match"), etag):
+        handler.send_response(304)
+        handler.send_header("ETag", etag)
+        handler.send_header("Cache-Control", asset.cache_control)
+        handler.send_header("Vary", "Accept-Encoding")
+        handler.send_header("Content-Length", "0")
+        handler.end_headers()
+        return
+    body = asset.variants[encoding]
+    handler.send_response(200)
+    handler.send_header("Content-Type", asset.ctype)
+    if encoding != "identity":
+        handler.send_header("Content-Encoding", encoding)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.send_header("ETag", etag)
+    handler.send_header("Cache-Control", asset.cache_control)
+    handler.send_header("Vary", "Accept-Encoding")
+    handler.end_headers()
+    if handler.command != "HEAD":
+        handler.wfile.write(body)
+
+
+def build_app(html, css, js):
+    """Routes for the page and its content-hashed CSS/JS.
+
+    ``html`` contains the placeholders {{css}} and {{js}}, replaced
+    with the hashed asset URLs.
+    """
+    css_asset = Asset(css, "text/css; charset=utf-8", immutable=True)
+    js_asset = Asset(js, "application/javascript; charset=utf-8", immutable=True)
+    css_url = f"/static/app.{css_asset.digest}.css"
+    js_url = f"/static/app.{js_asset.digest}.js"
+    page = Asset(html.replace("{{css}}", css_url).replace("{{js}}", js_url),
+                 "text/html; charset=utf-8")
+    return {"/": page, "/index.html": page, css_url: css_asset, js_url: js_asset}
@@ -0,0 +1,661 @@
+"""
+Persistent todo/notes store
+Collections live in memory; every change is appended to a journal
+and fsync'd in batches (group commit). Snapshots are written every
+few thousand changes, so startup loads the latest snapshot and
+replays only the journal written after it.
+
+The journal seq doubles as the collection revision: clients pass
+the last revision they saw and get back only what changed since.
+It also names new items: an item added by record N gets the id N in
+base 36, so ids are unique, short and ordered the way items were
+added, and replaying the journal gives them back unchanged.
+
+Items are never changed in place: an operation builds a new version
+of the item under that item's lock (one of a few striped locks), and
+only numbering the record and swapping the version in happen under
+the collection-wide lock. Writers on different items do not wait for
+each other's work (the GIL still runs their Python one at a time),
+and readers copy the dict of versions without copying the items.
+
+A batch of operations is one journal record: each operation still
+gets its own seq, but they reach the disk, the readers and the
+listeners together, or not at all after a crash.
+
+Files in the data directory, per collection:
+    <name>.snapshot.json          {"seq": N, "items": {...}}
+    <name>.<start seq>.journal    one JSON record per line
+"""
+
+import base64
+import bisect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, nullcontext
+from pathlib import Path
+
+from . import metrics
+
+FSYNC_SECONDS = metrics.histogram("ipad_journal_fsync_seconds", "Time to write and fsync a journal batch.")
+BATCH_RECORDS = metrics.histogram("ipad_journal_batch_records", "Records per journal fsync (group commit).",
+                                  buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+STRIPES = 64  # Lock per item = lock per hash(id) % STRIPES
+
+
+# Operations shared by todos and notes: (current item or None, record)
+# -> new item, or None if there is none. Replaying the same records in
+# order rebuilds the same state.
+
+def _op_add(item, rec):
+    return rec["item"]
+
+
+def _op_toggle(item, rec):
+    return {**item, "done": not item["done"]} if item is not None else None
+
+
+def _op_edit(item, rec):
+    return {**item, "text": rec["text"]} if item is not None else None
+
+
+def _op_put(item, rec):
+    # An item with its own id (feed items: a hash of the GUID); one
+    # that already exists is kept as it is
+    return item if item is not None else rec["item"]
+
+
+def _op_read(item, rec):
+    return {**item, "read": rec["read"]} if item is not None else None
+
+
+def _op_delete(item, rec):
+    return None
+
+
+def _op_comment(item, rec):
+    if item is None:
+        return None
+    return {**item, "comments": [*item.get("comments", []), rec["comment"]]}
+
+
+OPS = {
+    "add": _op_add,
+    "put": _op_put,
+    "read": _op_read,
+    "toggle": _op_toggle,
+    "edit": _op_edit,
+    "delete": _op_delete,
+    "comment": _op_comment,
+}
+
+
+def _body(fields):
+    """Encoded ``fields`` without "id" and without the opening brace.
+
+    Spliced after the record head once the seq is known, so the fields
+    are encoded outside the collection lock.
+    """
+    rest = {k: v for k, v in fields.items() if k != "id"}
+    return b"," + json.dumps(rest, separators=(",", ":")).encode()[1:] if rest else b"}"
+
+
+def _head(seq, op, item_id):
+    return b'{"seq":%d,"op":"%s","id":%s' % (seq, op.encode(), json.dumps(item_id).encode())
+
+
+def base36(n):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+        if not n:
+            return out
+
+
+def encode_cursor(key):
+    """Opaque page cursor for an index key."""
+    created, item_id = key[0], key[2]
+    return base64.urlsafe_b64encode(json.dumps([created, item_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Index key from ``encode_cursor()``; ValueError if it is not one."""
+    try:
+        created, item_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("bad cursor")
+    if not isinstance(created, str) or not isinstance(item_id, str):
+        raise ValueError("bad cursor")
+    return created, len(item_id), item_id
+
+
+class OrderedIndex:
+    """Item ids in creation order, overall and per value of ``field``.
+
+    Keys are (created, len(id), id), or the ``order_by`` field of the
+    item instead of "created": base 36 ids of the same length
+    compare like the numbers they stand for, so items created in the
+    same microsecond (or without "created", as old todos) still come out
+    in the order they were added. A page is a bisect and a slice.
+    """
+
+    ANY = object()  # page(): every item, whatever the value of ``field``
+
+    def __init__(self, field=None, order_by="created"):
+        self.field = field
+        self.order_by = order_by
+        self._all = []
+        self._by_value = {}  # value of field -> sorted keys
+        self._keys = {}  # id -> (key, value of field)
+
+    def __len__(self):
+        return len(self._all)
+
+    def _entry(self, item_id, item):
+        key = (item.get(self.order_by) or "", len(item_id), item_id)
+        return key, item.get(self.field) if self.field else None
+
+    def rebuild(self, items):
+        self._keys = {item_id: self._entry(item_id, item) for item_id, item in items.items()}
+        self._all = sorted(key for key, _ in self._keys.values())
+        self._by_value = {}
+        if self.field:
+            for key, value in self._keys.values():
+                self._by_value.setdefault(value, []).append(key)
+            for keys in self._by_value.values():
+                keys.sort()
+
+    def update(self, item_id, item):
+        """Index the current state of ``item_id`` (None once deleted)."""
+        new = self._entry(item_id, item) if item is not None else None
+        old = self._keys.get(item_id)
+        if new == old:
+            return  # Edits and comments leave the keys alone
+        if old is not None:
+            _remove(self._all, old[0])
+            if self.field:
+                _remove(self._by_value[old[1]], old[0])
+            del self._keys[item_id]
+        if new is not None:
+            _insert(self._all, new[0])
+            if self.field:
+                _insert(self._by_value.setdefault(new[1], []), new[0])
+            self._keys[item_id] = new
+
+    def page(self, value=ANY, after=None, limit=50, newest_first=False):
+        """(ids, last key or None if nothing follows) after the key ``after``.
+
+        With ``newest_first`` the order is reversed: "after" is older.
+        """
+        keys = self._all if value is self.ANY else self._by_value.get(value, [])
+        if newest_first:
+            end = bisect.bisect_left(keys, after) if after is not None else len(keys)
+            chunk = keys[max(end - limit, 0):end][::-1]
+            more = end > limit
+        else:
+            start = bisect.bisect_right(keys, after) if after is not None else 0
+            chunk = keys[start:start + limit]
+            more = start + limit < len(keys)
+        return [key[2] for key in chunk], (chunk[-1] if more and chunk else None)
+
+    def expired(self, before, keep):
+        """Ids ordered before ``before``, or past the newest ``keep``, oldest first."""
+        cut = max(bisect.bisect_left(self._all, (before,)), len(self._all) - keep)
+        return [key[2] for key in self._all[:cut]]
+
+
+def _insert(keys, key):
+    if not keys or keys[-1] < key:
+        keys.append(key)  # New items: the usual case
+    else:
+        bisect.insort(keys, key)
+
+
+def _remove(keys, key):
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """Append-only log segments written by one thread with group commit.
+
+    Records appended while an fsync is in progress are written and
+    synced together by the next one, so concurrent writers share the
+    cost of a single fsync.
+    """
+
+    def __init__(self, directory, name):
+        self.directory = Path(directory)
+        self.name = name
+        self.fsyncs = 0
+        self._cond = threading.Condition()
+        self._pending = []
+        self._appended = 0   # Last seq handed to append()
+        self._durable = 0    # Last seq on disk
+        self._file = None
+        self._error = None
+        self._closed = False
+        self._thread = None
+
+    def segments(self):
+        """Existing segment files as sorted (start seq, path) pairs."""
+        found = []
+        for path in self.directory.glob(f"{self.name}.*.journal"):
+            start = path.name[len(self.name) + 1:-len(".journal")]
+            if start.isdigit():
+                found.append((int(start), path))
+        return sorted(found)
+
+    def open(self, seq):
+        """Start a new segment after ``seq`` and the writer thread."""
+        self._appended = self._durable = seq
+        self._file = self._new_segment(seq + 1)
+        self._thread = threading.Thread(target=self._run, name=f"journal-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _new_segment(self, start):
+        path = self.directory / f"{self.name}.{start:012d}.journal"
+        f = open(path, "ab")
+        _fsync_dir(self.directory)
+        return f
+
+    def append(self, seq, line):
+        """Queue the encoded record ``seq`` (a line of JSON, newline included)."""
+        with self._cond:
+            if self._error:
+                raise self._error
+            self._pending.append(line)
+            self._appended = seq
+            self._cond.notify_all()
+
+    def wait(self, seq):
+        """Block until every record up to ``seq`` has been fsync'd."""
+        with self._cond:
+            while self._durable < seq and not self._error:
+                self._cond.wait()
+            if self._error:
+                raise self._error
+
+    def roll(self, seq):
+        """Flush everything up to ``seq`` and continue in a new segment.
+
+        Callers must stop appending while this runs (the collection lock
+        is held), so the old segment ends exactly at ``seq``.
+        """
+        self.wait(seq)
+        with self._cond:
+            self._file.close()
+            self._file = self._new_segment(seq + 1)
+
+    def prune(self, seq):
+        """Delete segments that only hold records up to ``seq``."""
+        segments = self.segments()
+        for (start, path), following in zip(segments, segments[1:]):
+            if following[0] <= seq + 1:
+                path.unlink()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                batch, self._pending = self._pending, []
+                upto = self._appended
+                f = self._file
+            started = time.perf_counter()
+            try:
+                f.write(b"".join(batch))
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            FSYNC_SECONDS.observe(time.perf_counter() - started)
+            BATCH_RECORDS.observe(len(batch))
+            with self._cond:
+                self.fsyncs += 1
+                self._durable = upto
+                self._cond.notify_all()
+
+
+class Collection:
+    """A dict of items whose every change goes through the journal.
+
+    Until ``open()`` is called the collection is memory-only.
+    """
+
+    def __init__(self, name, snapshot_every=10000, sync=True, max_changes=50000, index_by=None,
+                 order_by="created"):
+        self.name = name
+        self.snapshot_every = snapshot_every
+        self.sync = sync
+        self.max_changes = max_changes
+        self.items = {}
+        self.seq = 0
+        self.floor = 0  # Oldest revision changes() can answer from
+        self._changes = OrderedDict()  # id -> seq of its last change, oldest first
+        self.index = OrderedIndex(index_by, order_by)  # Creation order, per value of ``index_by``
+        self.journal = None
+        self.directory = None
+        self._lock = threading.Lock()  # Short: numbers records and swaps versions in
+        self._stripes = [threading.Lock() for _ in range(STRIPES)]  # Per-item read-modify-write
+        self._snapshot_lock = threading.Lock()
+        self._since_snapshot = 0
+        self.listeners = []  # Called with each committed record (see batch())
+
+    def __contains__(self, item_id):
+        return item_id in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, item_id):
+        """Current version of an item (do not modify it), or None."""
+        return self.items.get(item_id)
+
+    def copy(self):
+        """Copy of the items, each one a copy too."""
+        with self._lock:
+            items = self.items.copy()
+        return {k: dict(v) for k, v in items.items()}
+
+    def state(self):
+        """(revision, items) taken atomically.
+
+        The dict is a copy, the items are the current versions: they
+        are never modified, so they can be serialized without a lock.
+        """
+        with self._lock:
+            return self.seq, self.items.copy()
+
+    def item(self, item_id):
+        """Copy of a single item, or None if it does not exist."""
+        item = self.items.get(item_id)
+        return dict(item) if item is not None else None
+
+    def changes(self, since):
+        """Items changed and ids deleted after revision ``since``.
+
+        Returns ``(rev, changed, deleted)``, or None when ``since`` is
+        older than the retained history and the client must reload.
+        """
+        with self._lock:
+            if since < self.floor or since > self.seq:
+                return None
+            changed, deleted = {}, []
+            for item_id, seq in reversed(self._changes.items()):
+                if seq <= since:
+                    break
+                item = self.items.get(item_id)
+                if item is None:
+                    deleted.append(item_id)
+                else:
+                    changed[item_id] = item
+            return self.seq, changed, deleted
+
+    def page(self, value=OrderedIndex.ANY, cursor=None, limit=50, newest_first=False):
+        """(rev, [(id, item)], next cursor or None) in creation order.
+
+        ``value`` filters on the ``index_by`` field; ``cursor`` comes from
+        the previous page (ValueError if malformed).
+        """
+        after = decode_cursor(cursor) if cursor else None
+        with self._lock:
+            ids, last = self.index.page(value, after, limit, newest_first)
+            seq, items = self.seq, [(item_id, self.items[item_id]) for item_id in ids]
+        return seq, items, encode_cursor(last) if last is not None else None
+
+    def expired(self, before, keep):
+        """Ids of the items ordered before ``before`` or past the newest ``keep``."""
+        with self._lock:
+            return self.index.expired(before, keep)
+
+    def _track(self, item_id, seq):
+        self.index.update(item_id, self.items.get(item_id))
+        self._changes[item_id] = seq
+        self._changes.move_to_end(item_id)
+        if len(self._changes) > self.max_changes:
+            _, self.floor = self._changes.popitem(last=False)
+
+    # Persistence
+
+    @property
+    def snapshot_path(self):
+        return self.directory / f"{self.name}.snapshot.json"
+
+    def open(self, directory):
+        """Load the latest snapshot, replay the journal tail, start journaling."""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        journal = Journal(self.directory, self.name)
+        with self._lock:
+            self.items, self.seq = {}, 0
+            self._changes.clear()
+            if self.snapshot_path.exists():
+                with open(self.snapshot_path, "rb") as f:
+                    snap = json.load(f)
+                self.items, self.seq = snap["items"], snap["seq"]
+            self.index.rebuild(self.items)
+            self.floor = self.seq
+            self._replay(journal.segments())
+            journal.open(self.seq)
+            self.journal = journal
+
+    def _replay(self, segments):
+        for start, path in segments:
+            with open(path, "rb") as f:
+                lines = f.read().split(b"\n")
+            for i, line in enumerate(lines):
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    if i == len(lines) - 1:
+                        break  # Torn write from a crash, never acknowledged
+                    raise ValueError(f"corrupt journal record in {path} at line {i + 1}")
+                if rec["seq"] <= self.seq:
+                    continue
+                for sub in rec["ops"] if rec["op"] == "batch" else (rec,):
+                    item = OPS[sub["op"]](self.items.get(sub["id"]), sub)
+                    if item is None:
+                        self.items.pop(sub["id"], None)
+                    else:
+                        self.items[sub["id"]] = item
+                    self.seq = sub["seq"]
+                    self._track(sub["id"], self.seq)
+                    self._since_snapshot += 1
+
+    def add(self, item):
+        """Add ``item`` under a new id; returns (id, seq)."""
+        rec = self._commit("add", {"item": item})
+        return rec["id"], rec["seq"]
+
+    def commit(self, op, **fields):
+        """Apply an operation and journal it; returns the new seq.
+
+        An operation on an item that does not exist (checked under the
+        item's lock, so a concurrent delete cannot slip in between) is
+        not applied nor journaled, and returns None; "add" and "put"
+        make new items. With ``sync`` the call returns once the record
+        is on disk. The wait happens outside the lock so concurrent
+        writers share fsyncs.
+        """
+        rec = self._commit(op, fields)
+        return rec["seq"] if rec is not None else None
+
+    def _stripe(self, item_id):
+        return self._stripes[hash(item_id) % STRIPES]
+
+    def _commit(self, op, fields):
+        item_id = fields.get("id")
+        # The item's stripe keeps other writers of the same item out while
+        # the new version is built and the record encoded; then the
+        # collection lock only numbers the record and swaps the version in.
+        # Records on the same item get their seq in the order they are applied.
+        with self._stripe(item_id) if item_id is not None else nullcontext():
+            if item_id is not None:
+                item = self.items.get(item_id)
+                if item is None and op not in ("add", "put"):
+                    return None
+                item = OPS[op](item, fields)
+            else:
+                item = fields["item"]  # An add: the id comes with the seq
+            body = _body(fields)
+            with self._lock:
+                self.seq += 1
+                seq = self.seq
+                if item_id is None:
+                    item_id = base36(seq)  # Allocated under the lock: never reused
+                if item is None:
+                    self.items.pop(item_id, None)
+                else:
+                    self.items[item_id] = item
+                self._track(item_id, seq)
+                journal = self.journal  # close() may clear it once the lock is released
+                if journal is not None:
+                    journal.append(seq, _head(seq, op, item_id) + body + b"\n")
+                    self._since_snapshot += 1
+                snapshot_due = journal is not None and self._since_snapshot >= self.snapshot_every
+        if snapshot_due and not self._snapshot_lock.locked():
+            threading.Thread(target=self.snapshot, daemon=True).start()
+        if self.sync and journal is not None:
+            journal.wait(seq)
+        rec = {"seq": seq, "op": op, **fields, "id": item_id}
+        for listener in self.listeners:
+            listener(rec)
+        return rec
+
+    def batch(self, ops):
+        """Apply ``[(op, fields), ...]`` as one change; returns (seq, records).
+
+        Every operation gets its own seq, as if committed alone, but all
+        of them are journaled as one record and fsync'd once, and readers
+        see none or all of them. Operations on an item that does not
+        exist (or no longer does, earlier in the batch) are skipped: their
+        record is None. "add" and "put" make new items. Listeners get one
+        record, op "batch", with the applied records in "ops".
+        """
+        for op, fields in ops:
+            if op not in OPS or (op == "add") == ("id" in fields):
+                raise ValueError(f"bad operation: {op}")
+        # Stripes in index order, so two batches never wait on each other in a cycle
+        stripes = sorted({hash(fields["id"]) % STRIPES for op, fields in ops if op != "add"})
+        with ExitStack() as held:
+            for i in stripes:
+                held.enter_context(self._stripes[i])
+            staged, current = [], {}
+            for op, fields in ops:
+                item_id = fields.get("id")
+                if item_id is None:
+                    staged.append((op, fields, None, fields["item"], _body(fields)))
+                    continue
+                item = current[item_id] if item_id in current else self.items.get(item_id)
+                if item is None and op != "put":
+                    staged.append(None)
+                    continue
+                current[item_id] = item = OPS[op](item, fields)
+                staged.append((op, fields, item_id, item, _body(fields)))
+            applied, lines = [], []
+            with self._lock:
+                for entry in staged:
+                    if entry is None:
+                        applied.append(None)
+                        continue
+                    op, fields, item_id, item, body = entry
+                    self.seq += 1
+                    if item_id is None:
+                        item_id = base36(self.seq)
+                    if item is None:
+                        self.items.pop(item_id, None)
+                    else:
+                        self.items[item_id] = item
+                    self._track(item_id, self.seq)
+                    applied.append((self.seq, op, fields, item_id))
+                    lines.append(_head(self.seq, op, item_id) + body)
+                seq = self.seq
+                journal = self.journal
+                if journal is not None and lines:
+                    journal.append(seq, b'{"seq":%d,"op":"batch","ops":[%s]}\n' % (seq, b",".join(lines)))
+                    self._since_snapshot += len(lines)
+                snapshot_due = journal is not None and self._since_snapshot >= self.snapshot_every
+        if snapshot_due and not self._snapshot_lock.locked():
+            threading.Thread(target=self.snapshot, daemon=True).start()
+        records = [None if entry is None else {"seq": entry[0], "op": entry[1], **entry[2], "id": entry[3]}
+                   for entry in applied]
+        if lines:
+            if self.sync and journal is not None:
+                journal.wait(seq)
+            rec = {"seq": seq, "op": "batch", "ops": [r for r in records if r is not None]}
+            for listener in self.listeners:
+                listener(rec)
+        return seq, records
+
+    def snapshot(self):
+        """Write a compacted snapshot and drop the journal it replaces."""
+        with self._snapshot_lock:
+            self._snapshot()
+
+    def _snapshot(self):
+        # Under _snapshot_lock, so close() cannot take the journal away meanwhile
+        journal = self.journal
+        if journal is None:
+            return
+        with self._lock:
+            seq, items = self.seq, self.items.copy()
+            journal.roll(seq)
+            self._since_snapshot = 0
+        # Versions are never modified: encoding them needs no lock
+        data = json.dumps({"seq": seq, "items": items}, separators=(",", ":")).encode()
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        _fsync_dir(self.directory)
+        journal.prune(seq)
+
+    def close(self):
+        """Snapshot and stop journaling (called on shutdown).
+
+        A background snapshot still running is waited for; one started
+        later finds no journal and does nothing.
+        """
+        with self._snapshot_lock:
+            if self.journal is None:
+                return
+            self._snapshot()
+            with self._lock:
+                journal, self.journal = self.journal, None
+            journal.close()
+
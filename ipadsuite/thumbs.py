@@ -0,0 +1,103 @@
+"""
+Note image thumbnails
+Uploaded images are downscaled in a process pool, off the request
+threads, and the thumbnails are cached next to the original blob:
+
+    <dir>/<first 2 hex>/<sha256>.<size>.jpg
+
+Needs Pillow; without it the original image is always served.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow è opzionale
+    Image = None
+
+SIZES = (320, 1024)
+
+
+def make_thumbnails(src, sizes):
+    """Write a JPEG per size next to ``src``; returns the CPU seconds used.
+
+    Runs in a worker process.
+    """
+    start = time.process_time()
+    with Image.open(src) as img:
+        img.draft("RGB", (max(sizes), max(sizes)))  # Let JPEG decode at reduced scale
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        for size in sorted(sizes, reverse=True):
+            img.thumbnail((size, size), Image.LANCZOS)
+            tmp = f"{src}.{size}.tmp"
+            img.save(tmp, "JPEG", quality=80, optimize=True, progressive=True)
+            os.replace(tmp, f"{src}.{size}.jpg")
+    return time.process_time() - start
+
+
+class Thumbnailer:
+    """Schedules thumbnail jobs and resolves which file to serve for a width."""
+
+    def __init__(self, store, sizes=SIZES, workers=2):
+        self.store = store
+        self.sizes = tuple(sorted(sizes))
+        self.workers = workers
+        self._pool = None
+        self._pending = {}  # digest -> Future
+        self._failed = set()  # Not an image Pillow can read
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def submit(self, digest):
+        """Start generating thumbnails for a stored image (returns immediately)."""
+        if not self.available:
+            return None
+        src = self.store.path(digest)
+        with self._lock:
+            if digest in self._pending or digest in self._failed or self._done(src):
+                return self._pending.get(digest)
+            future = self._executor().submit(make_thumbnails, str(src), self.sizes)
+            self._pending[digest] = future
+        future.add_done_callback(lambda f: self._finished(digest, f))
+        return future
+
+    def _finished(self, digest, future):
+        with self._lock:
+            self._pending.pop(digest, None)
+            if future.cancelled() or future.exception() is not None:
+                self._failed.add(digest)
+
+    def _done(self, src):
+        return all(os.path.exists(f"{src}.{size}.jpg") for size in self.sizes)
+
+    def path(self, digest, width):
+        """(path, size) of the smallest thumbnail at least ``width`` wide.
+
+        Never waits: while the thumbnail is being made (a job is started
+        if there is none), or when none can be made, this is the
+        original with size None.
+        """
+        src = self.store.path(digest)
+        size = next((s for s in self.sizes if s >= width), self.sizes[-1])
+        thumb = f"{src}.{size}.jpg"
+        if os.path.exists(thumb):
+            return thumb, size
+        if src.exists():
+            self.submit(digest)  # Nothing to do if running, failed or without Pillow
+        return src, None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None